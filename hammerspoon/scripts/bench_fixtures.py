@@ -0,0 +1,203 @@
+import os
+import plistlib
+import struct
+
+# Synthetic app bundles for the benchmarks of the localization scripts, so that
+# they can be run on machines (and CI runners) without the apps installed.
+# Menus are made of NSMenuItem objects whose title is followed by its
+# localization key, as in the NIBs compiled by Xcode. The same menu is also
+# written in every other resource format utils.lua reads (.strings, .loctable,
+# gettext .mo, Qt .qm and Chromium .pak), at the places it looks for them.
+
+BUNDLE_ID = 'org.hammerspoon.bench'
+QT_CONTEXT = 'MainWindow'
+MENU = [
+    ('New', 'a1.title'),
+    ('Open…', 'b2.title'),
+    ('Save As…', 'c3.title'),
+    ('&Quit', 'd4.title'),
+    ('Name:', 'e5.title'),
+]
+TRANSLATIONS = {
+    'fr': ['Nouveau', 'Ouvrir…', 'Enregistrer sous…', '&Quitter', 'Nom :'],
+    'de': ['Neu', 'Öffnen…', 'Sichern unter…', '&Beenden', 'Name:'],
+}
+
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        byte, n = n & 0x7f, n >> 7
+        if n == 0:
+            out.append(byte | 0x80)
+            return bytes(out)
+        out.append(byte)
+
+
+def write_nib(keys, class_names, objects):
+    """NIBArchive of `objects`, each a (class index, [(key index, data)]) pair.
+
+    `keys` and `class_names` are lists of names; all values are stored as data.
+    """
+    object_block = value_block = b''
+    value_count = 0
+    for class_index, values in objects:
+        object_block += _varint(class_index) + _varint(value_count) + _varint(len(values))
+        for key_index, data in values:
+            value_block += _varint(key_index) + bytes([8]) + _varint(len(data)) + data
+        value_count += len(values)
+    key_block = b''.join(_varint(len(k)) + k for k in (key.encode('utf-8') for key in keys))
+    class_block = b''.join(
+        _varint(len(name) + 1) + _varint(0) + name + b'\0' for name in (c.encode('utf-8') for c in class_names)
+    )
+    offset = len(b'NIBArchive') + 40
+    header = struct.pack(
+        '<10i', 1, 9,
+        len(objects), offset,
+        len(keys), offset + len(object_block),
+        value_count, offset + len(object_block) + len(key_block),
+        len(class_names), offset + len(object_block) + len(key_block) + len(value_block),
+    )
+    return b'NIBArchive' + header + object_block + key_block + value_block + class_block
+
+
+def make_nib(pairs, nested=()):
+    """NIBArchive holding one menu item per (title, key) pair.
+
+    Each NIBArchive in `nested` is stored as the data of one more object.
+    """
+    objects = [(0, [(0, title.encode('utf-8')), (1, key.encode('utf-8'))]) for title, key in pairs]
+    objects += [(1, [(2, data)]) for data in nested]
+    return write_nib(['NSTitle', 'UINibEncoderEmptyKey', 'NSNibData'], ['NSMenuItem', 'NSNib'], objects)
+
+
+def make_keyed_nib(pairs):
+    """NSKeyedArchiver plist holding one menu item per (title, key) pair."""
+    uid = plistlib.UID
+    objects = ['$null', {'$classname': 'NSMenuItem', '$classes': ['NSMenuItem', 'NSObject']}]
+    items = []
+    for title, key in pairs:
+        objects += [key, title]
+        objects.append({'$class': uid(1), 'NSKey': uid(len(objects) - 2), 'NSTitle': uid(len(objects) - 1)})
+        items.append(uid(len(objects) - 1))
+    objects.append({'$class': uid(1), 'NSItems': items})
+    return plistlib.dumps({
+        '$archiver': 'NSKeyedArchiver', '$version': 100000,
+        '$top': {'root': uid(len(objects) - 1)}, '$objects': objects,
+    }, fmt=plistlib.FMT_BINARY)
+
+
+def make_strings(pairs):
+    """Old-style .strings file mapping each key to its title."""
+    def quote(string):
+        return '"%s"' % string.replace('\\', '\\\\').replace('"', '\\"')
+    return ''.join('%s = %s;\n' % (quote(key), quote(title)) for title, key in pairs).encode('utf-8')
+
+
+def make_mo(messages):
+    """GNU gettext catalog translating each msgid of `messages` to its msgstr."""
+    messages = dict(messages)
+    messages[''] = 'Content-Type: text/plain; charset=UTF-8\n'
+    ids = sorted(messages)
+    originals = [msgid.encode('utf-8') for msgid in ids]
+    translations = [messages[msgid].encode('utf-8') for msgid in ids]
+    tables_end = 28 + 16 * len(ids)
+    data, table = b'', []
+    for strings in (originals, translations):
+        for string in strings:
+            table.append((len(string), tables_end + len(data)))
+            data += string + b'\0'
+    header = struct.pack('<7I', 0x950412de, 0, len(ids), 28, 28 + 8 * len(ids), 0, tables_end)
+    return header + b''.join(struct.pack('<2I', *entry) for entry in table) + data
+
+
+def _elf_hash(data):
+    h = 0
+    for byte in data:
+        h = ((h << 4) + byte) & 0xffffffff
+        g = h & 0xf0000000
+        if g:
+            h ^= g >> 24
+        h &= ~g & 0xffffffff
+    return h or 1
+
+
+def make_qm(messages, context=QT_CONTEXT):
+    """Qt translation file translating each source text of `messages`."""
+    hashes, records = [], b''
+    for source, translation in messages:
+        translation = translation.encode('utf-16-be')
+        source = source.encode('utf-8')
+        hashes.append((_elf_hash(source), len(records)))
+        records += b'\x03' + struct.pack('>I', len(translation)) + translation
+        records += b'\x06' + struct.pack('>I', len(source)) + source
+        records += b'\x07' + struct.pack('>I', len(context)) + context.encode('utf-8')
+        records += b'\x01'
+    hash_table = b''.join(struct.pack('>2I', *entry) for entry in sorted(hashes))
+    magic = bytes.fromhex('3cb86418caef9c95cd211cbf60a1bddd')
+    return (
+        magic
+        + b'\x42' + struct.pack('>I', len(hash_table)) + hash_table
+        + b'\x69' + struct.pack('>I', len(records)) + records
+    )
+
+
+def make_pak(strings):
+    """Chromium resource pack (version 5) holding `strings` as UTF-8 resources."""
+    resources = [string.encode('utf-8') for string in strings]
+    offset = 12 + 6 * (len(resources) + 1)
+    index = b''
+    for resource_id, resource in enumerate(resources, 1):
+        index += struct.pack('<HI', resource_id, offset)
+        offset += len(resource)
+    index += struct.pack('<HI', 0, offset)
+    return struct.pack('<IIHH', 5, 1, len(resources), 0) + index + b''.join(resources)
+
+
+def make_app(root, name='Bench', version='1.0', bundle_id=BUNDLE_ID, keyed=False):
+    """Create `<root>/<name>.app` and return its path.
+
+    Every locale has a menu NIB (a NIBArchive, or a keyed archive inside a .nib
+    directory if `keyed`), and .strings, .pak, .mo and .qm files; a loctable
+    holds the same strings for all of them.
+    """
+    app = os.path.join(root, name + '.app')
+    resources = os.path.join(app, 'Contents', 'Resources')
+    os.makedirs(resources, exist_ok=True)
+    with open(os.path.join(app, 'Contents', 'Info.plist'), 'wb') as fp:
+        info = {'CFBundleName': name, 'CFBundleShortVersionString': version, 'CFBundleVersion': version}
+        if bundle_id is not None:
+            info['CFBundleIdentifier'] = bundle_id
+        plistlib.dump(info, fp)
+
+    for locale, titles in [('en', [title for title, _ in MENU])] + list(TRANSLATIONS.items()):
+        pairs = [(title, key) for title, (_, key) in zip(titles, MENU)]
+        lproj = os.path.join(resources, locale + '.lproj')
+        os.makedirs(lproj, exist_ok=True)
+        if keyed:
+            os.makedirs(os.path.join(lproj, 'MainMenu.nib'), exist_ok=True)
+            path, data = os.path.join(lproj, 'MainMenu.nib', 'keyedobjects.nib'), make_keyed_nib(pairs)
+        else:
+            path, data = os.path.join(lproj, 'MainMenu.nib'), make_nib(pairs)
+        with open(path, 'wb') as fp:
+            fp.write(data)
+
+        files = {
+            os.path.join(lproj, 'Localizable.strings'): make_strings(pairs),
+            os.path.join(lproj, 'locale.pak'): make_pak(titles),
+            os.path.join(resources, 'locale', locale, 'LC_MESSAGES', 'bench.mo'):
+                make_mo(zip([title for title, _ in MENU], titles)),
+            os.path.join(resources, '%s_%s.qm' % (name.lower(), locale)):
+                make_qm(zip([title for title, _ in MENU], titles)),
+        }
+        for path, data in files.items():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as fp:
+                fp.write(data)
+
+    tables = {'en': {key: title for title, key in MENU}}
+    for locale, titles in TRANSLATIONS.items():
+        tables[locale] = {key: title for title, (_, key) in zip(titles, MENU)}
+    with open(os.path.join(resources, 'Localizable.loctable'), 'wb') as fp:
+        plistlib.dump(tables, fp, fmt=plistlib.FMT_BINARY)
+    return app
@@ -0,0 +1,107 @@
+import argparse
+import io
+import statistics
+import time
+import tracemalloc
+
+import bench_fixtures
+import nibarchive
+
+# Measures the NIB library in-process, on synthetic NIBArchive files of
+# increasing size: how long align_strings() takes to pair the strings of a base
+# NIB with those of a translation that lacks some of its items (so that the
+# archives differ in structure and cannot be paired index by index). It also
+# measures parsing many archives that share their key and class names, as
+# batch runs do, with one shared symbol table and with a new table per archive
+# (which decodes every name into fresh objects): the time to parse them, and
+# the memory they hold while kept resident.
+
+SIZES = (1000, 5000, 20000)
+# one in this many items of the base NIB is missing from the translation
+MISSING_EVERY = 500
+# archives parsed per resident case, and the names each of them uses
+RESIDENT_ARCHIVES = 200
+KEY_NAMES = 60
+CLASS_NAMES = 25
+
+
+def archive(pairs):
+    return nibarchive.NIBArchiveParser().parse(io.BytesIO(bench_fixtures.make_nib(pairs)))
+
+
+def timed(fn, repeat):
+    """Median and minimum of `repeat` runs of `fn`, in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), min(times)
+
+
+def align_cases(sizes):
+    for size in sizes:
+        base_pairs = [('String %d' % i, 'k%d.title' % i) for i in range(size)]
+        target_pairs = [('Chaîne %d' % i, key) for i, (_, key) in enumerate(base_pairs)
+                        if i % MISSING_EVERY != MISSING_EVERY // 2]
+        base, target = archive(base_pairs), archive(target_pairs)
+        yield 'align_strings %d items' % size, lambda base=base, target=target: nibarchive.align_strings(base, target)
+
+
+def resident_nib():
+    """NIB with many key and class names, and a nested archive using the same names."""
+    keys = ['NSKey%02d' % i for i in range(KEY_NAMES)]
+    classes = ['NSClass%02d' % i for i in range(CLASS_NAMES)]
+    objects = [
+        (i % CLASS_NAMES, [((i + j) % KEY_NAMES, ('value %d' % j).encode('utf-8')) for j in range(4)])
+        for i in range(100)
+    ]
+    inner = bench_fixtures.write_nib(keys, classes, objects)
+    return bench_fixtures.write_nib(keys, classes, objects + [(0, [(0, inner)])])
+
+
+def parse_all(data, count, shared):
+    table = nibarchive.SymbolTable()
+    return [
+        nibarchive.NIBArchiveParser(symbols=table if shared else nibarchive.SymbolTable()).parse(io.BytesIO(data))
+        for _ in range(count)
+    ]
+
+
+def resident_memory(data, count, shared):
+    """KiB held by `count` parsed copies of `data`."""
+    tracemalloc.start()
+    archives = parse_all(data, count, shared)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del archives
+    return size / 1024
+
+
+def main(cmd=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsing and aligning NIBs in-process.")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Runs per case.")
+    parser.add_argument("-s", "--size", type=int, action="append", dest="sizes",
+                        help="Number of items of the base NIB (repeatable).")
+    parser.add_argument("-r", "--resident", type=int, default=RESIDENT_ARCHIVES,
+                        help="Number of archives kept resident when measuring symbol tables.")
+    args = parser.parse_args(cmd)
+
+    results = [(name, timed(fn, args.repeat)) for name, fn in align_cases(args.sizes or SIZES)]
+    width = max(len(name) for name, _ in results)
+    print(f"{'case':<{width}}  {'median':>10}  {'min':>10}")
+    for name, (median, least) in results:
+        print(f"{name:<{width}}  {median:>8.1f}ms  {least:>8.1f}ms")
+
+    data = resident_nib()
+    print()
+    print(f"{'%d resident archives' % args.resident:<{width}}  {'parse':>10}  {'memory':>10}")
+    for shared in (True, False):
+        median, _ = timed(lambda: parse_all(data, args.resident, shared), args.repeat)
+        memory = resident_memory(data, args.resident, shared)
+        name = 'shared symbol table' if shared else 'table per archive'
+        print(f"{name:<{width}}  {median:>8.1f}ms  {memory:>7.0f}KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import bench_fixtures
+
+# Replays a trace of localize/delocalize queries against the same tools
+# utils.lua runs for each resource format, and reports the end-to-end latency
+# of every query (all processes it spawns included) and how many of them found
+# a translation. Lua-side memoization is not modelled: every query goes through
+# the tools, as the first lookup of a string does.
+#
+# The trace is replayed twice: the cold pass starts from an empty locale cache,
+# so the first query on each file pays for building its artifacts, and the warm
+# pass repeats it on the cache the cold pass left behind.
+#
+# A trace is a JSON Lines file with one query per line:
+#   {"op": "localize", "format": "nib", "string": "Save As...", "locale": "fr",
+#    "expected": "Enregistrer sous…", "app": "/Applications/Foo.app"}
+# where "op" is "localize" or "delocalize", "expected" is optional (null for
+# queries that must miss) and "app" defaults to the synthetic fixture app (with
+# NIBs stored as keyed archives for the "keyed_nib" format).
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.dirname(HERE)
+EN_LOCALES = ['en', 'English', 'Base', 'en_US', 'en_GB']
+FORMATS = ['nib', 'keyed_nib', 'loctable', 'strings', 'mo', 'qm', 'pak']
+
+
+class Replayer:
+    """Runs queries the way utils.lua does, from the Hammerspoon config dir."""
+
+    def __init__(self, python, cache):
+        self.python = python
+        self.cache = cache
+
+    def execute(self, argv):
+        proc = subprocess.run(argv, cwd=CONFIG_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        output = proc.stdout.decode('utf-8', errors='replace')
+        return output if proc.returncode == 0 and output != '' else None
+
+    @staticmethod
+    def resources(app):
+        return os.path.join(app, 'Contents', 'Resources')
+
+    @staticmethod
+    def en_locale(resources):
+        for locale in EN_LOCALES:
+            if os.path.isdir(os.path.join(resources, locale + '.lproj')):
+                return locale
+
+    def unavailable(self, fmt):
+        """Why queries of `fmt` cannot be replayed on this machine, or None."""
+        needs = {
+            'strings': ['plutil'],
+            'mo': ['zsh', 'msgunfmt'],
+            'qm': ['zsh', 'lconvert'],
+        }.get(fmt, [])
+        missing = [tool for tool in needs if shutil.which(tool) is None]
+        if missing:
+            return 'needs ' + ', '.join(missing)
+        if fmt == 'pak' and sys.platform != 'darwin':
+            return 'scripts/pak is a macOS binary'
+        return None
+
+    def query(self, fmt, op, string, locale, app):
+        method = '_nib' if fmt == 'keyed_nib' else '_' + fmt
+        return getattr(self, method)(op == 'delocalize', string, locale, app)
+
+    def _loctable(self, delocalize, string, locale, app):
+        script = 'loctable_delocalize.py' if delocalize else 'loctable_localize.py'
+        path = os.path.join(self.resources(app), 'Localizable.loctable')
+        return self.execute([self.python, 'scripts/' + script, path, string, locale, self.cache])
+
+    def _nib(self, delocalize, string, locale, app):
+        resources = self.resources(app)
+        lproj = os.path.join(resources, locale + '.lproj')
+        en_lproj = os.path.join(resources, '%s.lproj' % self.en_locale(resources))
+        stems = sorted(f[:-4] for f in os.listdir(en_lproj) if f.endswith('.nib'))
+        argv = [self.python, 'scripts/locale_search.py', 'nib', string, en_lproj, lproj] + stems
+        output = self.execute(argv + ['-c', self.cache] + (['-d'] if delocalize else []))
+        return json.loads(output)['result'] if output is not None else None
+
+    def _strings(self, delocalize, string, locale, app):
+        resources = self.resources(app)
+        en_locale = self.en_locale(resources)
+        tables = []
+        for lproj in (en_locale, locale):
+            output = self.execute([
+                'plutil', '-convert', 'json', '-o', '-',
+                os.path.join(resources, lproj + '.lproj', 'Localizable.strings'),
+            ])
+            tables.append(json.loads(output) if output is not None else {})
+        source, target = tables if not delocalize else reversed(tables)
+        for key, value in source.items():
+            if value == string and key in target:
+                return target[key]
+        return None
+
+    def _mo(self, delocalize, string, locale, app):
+        script = 'mono_delocalize.sh' if delocalize else 'mono_localize.sh'
+        directory = os.path.join(self.resources(app), 'locale', locale, 'LC_MESSAGES')
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            if name.endswith('.mo'):
+                result = self.execute(['zsh', 'scripts/' + script, os.path.join(directory, name), string])
+                if result is not None:
+                    return result
+        return None
+
+    def _qm(self, delocalize, string, locale, app):
+        script = 'qm_delocalize.sh' if delocalize else 'qm_localize.sh'
+        resources = self.resources(app)
+        for name in sorted(os.listdir(resources)):
+            if name.endswith('_%s.qm' % locale):
+                result = self.execute(['zsh', 'scripts/' + script, os.path.join(resources, name), string])
+                if result is not None:
+                    return result
+        return None
+
+    def _pak(self, delocalize, string, locale, app):
+        resources = self.resources(app)
+        en_locale = self.en_locale(resources)
+        source, target = (locale, en_locale) if delocalize else (en_locale, locale)
+        for name in sorted(os.listdir(os.path.join(resources, source + '.lproj'))):
+            if not name.endswith('.pak'):
+                continue
+            unpacked = [self._unpack(resources, lproj, name) for lproj in (source, target)]
+            if not os.path.isdir(unpacked[0]):
+                continue
+            for resource in sorted(os.listdir(unpacked[0])):
+                with open(os.path.join(unpacked[0], resource), 'r', encoding='utf-8', errors='replace') as fp:
+                    if fp.read() != string:
+                        continue
+                match = os.path.join(unpacked[1], resource)
+                if os.path.exists(match):
+                    with open(match, 'r', encoding='utf-8', errors='replace') as fp:
+                        return fp.read()
+        return None
+
+    def _unpack(self, resources, lproj, name):
+        # like utils.lua, unpacked packs stay in the locale temp dir
+        tmpdir = os.path.join(self.cache, 'pak', lproj, name[:-4])
+        if not os.path.isdir(tmpdir) or not os.listdir(tmpdir):
+            os.makedirs(os.path.dirname(tmpdir), exist_ok=True)
+            self.execute(['scripts/pak', '-u', os.path.join(resources, lproj + '.lproj', name), tmpdir])
+        return tmpdir
+
+
+def synthetic_trace(count, seed=0, formats=FORMATS):
+    """Queries over the fixture app with a skewed popularity, like menu walks.
+
+    Besides exact titles, some queries use the ASCII spelling of an ellipsis
+    ("Save As...") or miss altogether.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for fmt in formats:
+        for locale, titles in bench_fixtures.TRANSLATIONS.items():
+            for (title, _), translation in zip(bench_fixtures.MENU, titles):
+                # untranslated strings are left out of NIB alignments, and
+                # utils.lua keeps the original string when there is no result
+                expected = {'expected': translation} if translation != title else {}
+                queries.append(dict({'op': 'localize', 'format': fmt, 'string': title,
+                                     'locale': locale}, **expected))
+                expected = {'expected': title} if translation != title else {}
+                queries.append(dict({'op': 'delocalize', 'format': fmt, 'string': translation,
+                                     'locale': locale}, **expected))
+                if title.endswith('…'):
+                    queries.append({'op': 'localize', 'format': fmt, 'string': title[:-1] + '...',
+                                    'locale': locale})
+            queries.append({'op': 'localize', 'format': fmt, 'string': 'No Such Item',
+                            'locale': locale, 'expected': None})
+    rng.shuffle(queries)
+    weights = [1 / (rank + 1) for rank in range(len(queries))]
+    return rng.choices(queries, weights, k=count)
+
+
+def load_trace(path):
+    with open(path, 'r', encoding='utf-8') as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of `samples`."""
+    ordered = sorted(samples)
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+
+def replay(trace, apps, python):
+    root = tempfile.mkdtemp(prefix='bench-replay-')
+    try:
+        replayer = Replayer(python, os.path.join(root, 'cache'))
+        unavailable = {}
+        results = {}
+        for pass_name in ('cold', 'warm'):
+            for query in trace:
+                fmt = query['format']
+                if fmt not in unavailable:
+                    unavailable[fmt] = replayer.unavailable(fmt)
+                if unavailable[fmt] is not None:
+                    continue
+                start = time.perf_counter()
+                result = replayer.query(fmt, query['op'], query['string'], query['locale'], query.get('app', apps[query['format'] == 'keyed_nib']))
+                elapsed = time.perf_counter() - start
+                stats = results.setdefault((fmt, pass_name), {'latencies': [], 'hits': 0, 'wrong': 0})
+                stats['latencies'].append(elapsed)
+                stats['hits'] += result is not None
+                stats['wrong'] += 'expected' in query and result != query['expected']
+        return results, {fmt: reason for fmt, reason in unavailable.items() if reason is not None}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def summarize(results):
+    summary = {}
+    for (fmt, pass_name), stats in sorted(results.items()):
+        latencies = stats['latencies']
+        summary['%s (%s)' % (fmt, pass_name)] = {
+            'queries': len(latencies),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'hit_rate': round(stats['hits'] / len(latencies), 4),
+            'wrong': stats['wrong'],
+        }
+    return summary
+
+
+def report(summary, unavailable):
+    width = max([len(name) for name in summary] + [len('format')])
+    print(f"{'format':<{width}}  {'queries':>7}  {'p50':>8}  {'p95':>8}  {'p99':>8}  {'hits':>6}  {'wrong':>5}")
+    for name, row in summary.items():
+        print(
+            f"{name:<{width}}  {row['queries']:>7}  {row['p50_ms']:>6.1f}ms  {row['p95_ms']:>6.1f}ms"
+            f"  {row['p99_ms']:>6.1f}ms  {row['hit_rate']:>6.1%}  {row['wrong']:>5}"
+        )
+    for fmt, reason in sorted(unavailable.items()):
+        print(f"{fmt}: not replayed ({reason})")
+
+
+def main(cmd=None):
+    parser = argparse.ArgumentParser(
+        description="Replay localize/delocalize queries and report their end-to-end latency."
+    )
+    parser.add_argument("-t", "--trace", help="JSON Lines trace to replay (default: a synthetic one).")
+    parser.add_argument("-n", "--count", type=int, default=500, help="Number of synthetic queries.")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Seed of the synthetic trace.")
+    parser.add_argument("-f", "--format", action="append", dest="formats", choices=FORMATS,
+                        help="Only replay queries of this format (repeatable).")
+    parser.add_argument("-p", "--python", default=sys.executable, help="Interpreter to run the scripts with (utils.lua uses /usr/bin/python3).")
+    parser.add_argument("--save-trace", help="Write the replayed trace as JSON Lines.")
+    parser.add_argument("-o", "--output", help="Save the results as JSON.")
+    args = parser.parse_args(cmd)
+
+    root = tempfile.mkdtemp(prefix='bench-replay-app-')
+    try:
+        apps = [
+            bench_fixtures.make_app(root),
+            bench_fixtures.make_app(root, 'BenchKeyed', bundle_id=bench_fixtures.BUNDLE_ID + '.keyed', keyed=True),
+        ]
+        trace = load_trace(args.trace) if args.trace else synthetic_trace(args.count, args.seed)
+        if args.formats:
+            trace = [query for query in trace if query['format'] in args.formats]
+        if args.save_trace:
+            with open(args.save_trace, 'w', encoding='utf-8') as fp:
+                for query in trace:
+                    fp.write(json.dumps(query, ensure_ascii=False) + '\n')
+        results, unavailable = replay(trace, apps, args.python)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    summary = summarize(results)
+    report(summary, unavailable)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump({'queries': len(trace), 'results': summary, 'unavailable': unavailable}, fp, indent=2)
+
+
+if __name__ == "__main__":
+    main()
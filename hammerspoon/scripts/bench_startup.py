@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import bench_fixtures
+
+# Measures how long the scripts spawned by utils.lua take from starting the
+# interpreter to their first byte of output (or to exiting, for scripts that
+# print nothing), for every subcommand on a synthetic app. Cold runs start with
+# an empty locale cache, warm runs hit the artifacts of a previous run. Results
+# can be saved and compared against those of an earlier revision.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def cases(app, keyed_app, cache):
+    resources = os.path.join(app, 'Contents', 'Resources')
+    base_nib = os.path.join(resources, 'en.lproj', 'MainMenu.nib')
+    keyed_nib = os.path.join(keyed_app, 'Contents', 'Resources', 'en.lproj', 'MainMenu.nib', 'keyedobjects.nib')
+    loctable = os.path.join(resources, 'Localizable.loctable')
+    json_out = os.path.join(cache, bench_fixtures.BUNDLE_ID, 'en', 'MainMenu.json')
+    return [
+        ('python', ['-c', 'pass']),
+        ('nib_parse dump-titles', ['nib_parse.py', 'dump-titles', base_nib, '-c', cache]),
+        ('nib_parse dump-titles -s', ['nib_parse.py', 'dump-titles', base_nib, '-s', 'Save As...', '-c', cache]),
+        ('nib_parse dump-titles keyed', ['nib_parse.py', 'dump-titles', keyed_nib, '-c', cache]),
+        ('nib_parse dump-json', ['nib_parse.py', 'dump-json', base_nib, '-o', json_out, '-c', cache]),
+        ('nib_parse dump-swift', ['nib_parse.py', 'dump-swift', base_nib, '-o', os.devnull]),
+        ('loctable_localize', ['loctable_localize.py', loctable, 'Save As...', 'fr', cache]),
+        ('loctable_delocalize', ['loctable_delocalize.py', loctable, 'Sichern unter…', 'de', cache]),
+        ('locale_search loctable', ['locale_search.py', 'loctable', 'Open…', 'de', loctable, '-c', cache]),
+        ('locale_search nib', ['locale_search.py', 'nib', 'Save As...', os.path.join(resources, 'en.lproj'),
+                               os.path.join(resources, 'fr.lproj'), 'MainMenu', '-c', cache]),
+        ('localecache check', ['localecache.py', 'check', cache, bench_fixtures.BUNDLE_ID, app]),
+    ]
+
+
+def time_to_first_output(python, argv):
+    """Seconds until the first byte of output and until exit."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([python] + argv, cwd=HERE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    proc.stdout.read(1)
+    first = time.perf_counter() - start
+    proc.stdout.read()
+    proc.wait()
+    return first, time.perf_counter() - start
+
+
+def run(python, repeat):
+    root = tempfile.mkdtemp(prefix='bench-startup-')
+    try:
+        app = bench_fixtures.make_app(root)
+        keyed_app = bench_fixtures.make_app(root, 'BenchKeyed', bundle_id=bench_fixtures.BUNDLE_ID + '.keyed', keyed=True)
+        cache = os.path.join(root, 'cache')
+        results = {}
+        for name, argv in cases(app, keyed_app, cache):
+            for mode in ('cold', 'warm'):
+                if mode == 'cold' and name == 'python':
+                    continue
+                firsts, totals = [], []
+                for _ in range(repeat):
+                    if mode == 'cold':
+                        shutil.rmtree(cache, ignore_errors=True)
+                    else:
+                        # the run before has populated the cache
+                        time_to_first_output(python, argv)
+                    first, total = time_to_first_output(python, argv)
+                    firsts.append(first)
+                    totals.append(total)
+                results[f'{name} ({mode})' if name != 'python' else name] = {
+                    'first_output_ms': round(statistics.median(firsts) * 1000, 2),
+                    'first_output_min_ms': round(min(firsts) * 1000, 2),
+                    'exit_ms': round(statistics.median(totals) * 1000, 2),
+                }
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def report(results, baseline=None):
+    width = max(len(name) for name in results)
+    print(f"{'command':<{width}}  {'first output':>12}  {'min':>8}  {'exit':>8}" + ('  {:>8}'.format('delta') if baseline else ''))
+    for name, result in results.items():
+        line = f"{name:<{width}}  {result['first_output_ms']:>10.1f}ms  {result['first_output_min_ms']:>6.1f}ms  {result['exit_ms']:>6.1f}ms"
+        if baseline and name in baseline:
+            line += '  {:>+6.1f}ms'.format(result['first_output_ms'] - baseline[name]['first_output_ms'])
+        print(line)
+
+
+def main(cmd=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark interpreter start to first output of the localization scripts."
+    )
+    parser.add_argument("-p", "--python", default=sys.executable, help="Interpreter to run the scripts with (utils.lua uses /usr/bin/python3).")
+    parser.add_argument("-n", "--repeat", type=int, default=10, help="Runs per command and mode.")
+    parser.add_argument("-o", "--output", help="Save the results as JSON.")
+    parser.add_argument("-b", "--baseline", help="Compare with results saved by an earlier run.")
+    args = parser.parse_args(cmd)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as fp:
+            baseline = json.load(fp)['results']
+    results = run(args.python, args.repeat)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump({'python': args.python, 'repeat': args.repeat, 'results': results}, fp, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import abc
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+# Reports which directories below a set of roots changed, so that long-running
+# tools only rescan those. inotify (through libc, no third-party modules) is
+# used on Linux, and kqueue on macOS when asked for: it has only been tested
+# where select.kqueue exists, so polling stays the default there. Both watch
+# every directory, and kqueue also the files callers care about, since it does
+# not report changes to the files of a directory. If that takes more
+# descriptors than the process may open, or neither is available, the roots
+# are polled: every directory is stat()ed and only those whose mtime changed
+# are listed again, together with the stamps of watched files.
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+EVENT_HEADER = struct.Struct('iIII')
+
+# kqueue vnode events
+NOTE_DELETE = 0x00000001
+NOTE_WRITE = 0x00000002
+NOTE_EXTEND = 0x00000004
+NOTE_ATTRIB = 0x00000008
+NOTE_RENAME = 0x00000020
+NOTE_REVOKE = 0x00000040
+VNODE_MASK = NOTE_DELETE | NOTE_WRITE | NOTE_EXTEND | NOTE_ATTRIB | NOTE_RENAME | NOTE_REVOKE
+# open for event notifications only, without keeping the volume busy
+O_EVTONLY = getattr(os, 'O_EVTONLY', 0x8000 if sys.platform == 'darwin' else os.O_RDONLY)
+# descriptors left for everything else the process opens
+RESERVED_FDS = 64
+
+
+class Watcher(abc.ABC):
+    """Base of the watchers; `wait` returns changed directories, or None for all."""
+
+    @abc.abstractmethod
+    def wait(self, timeout=None):
+        """Directories that changed within `timeout` seconds (forever if None)."""
+
+    def wait_quiet(self, debounce, max_delay=None):
+        """Block until something changed and then nothing did for `debounce` seconds.
+
+        Bursts of changes, like an app being installed file by file, are thus
+        reported once. Returns the changed directories, or None if everything
+        has to be rescanned.
+        """
+        changed = self.wait()
+        deadline = time.monotonic() + (max_delay if max_delay is not None else 10 * debounce)
+        while changed is None or changed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            more = self.wait(min(debounce, remaining))
+            if more is not None and not more:
+                break
+            changed = None if changed is None or more is None else changed | more
+        return changed
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PollingWatcher(Watcher):
+    """Stats directories and watched files every `interval` seconds.
+
+    `files` tells which file names to watch for changes in place; changes to
+    other files are only seen when they are created, removed or renamed.
+    """
+
+    def __init__(self, roots, interval=5.0, files=None):
+        self.interval = interval
+        self.files = files
+        # directory => (mtime, subdirectories, watched files)
+        self.dirs = {}
+        self.stamps = {}
+        for root in roots:
+            self._list(root)
+
+    def _list(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        subdirs, files = [], []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif self.files is not None and self.files(entry.name):
+                    files.append(entry.path)
+                    st = entry.stat(follow_symlinks=False)
+                    self.stamps[entry.path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        self.dirs[directory] = (mtime, subdirs, files)
+        for subdir in subdirs:
+            if subdir not in self.dirs:
+                self._list(subdir)
+
+    def _forget(self, directory):
+        prefix = directory + os.sep
+        for path in [d for d in self.dirs if d == directory or d.startswith(prefix)]:
+            for file in self.dirs.pop(path)[2]:
+                self.stamps.pop(file, None)
+
+    def poll(self):
+        changed = set()
+        for directory in list(self.dirs):
+            if directory not in self.dirs:
+                continue
+            mtime, subdirs, files = self.dirs[directory]
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                self._forget(directory)
+                changed.add(os.path.dirname(directory))
+                continue
+            if current != mtime:
+                # entries were added, removed or renamed
+                changed.add(directory)
+                for subdir in subdirs:
+                    if not os.path.isdir(subdir):
+                        self._forget(subdir)
+                for file in files:
+                    self.stamps.pop(file, None)
+                self._list(directory)
+                continue
+            for file in files:
+                try:
+                    st = os.stat(file)
+                    stamp = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    stamp = None
+                if stamp != self.stamps.get(file):
+                    self.stamps[file] = stamp
+                    changed.add(directory)
+        return changed
+
+    def wait(self, timeout=None):
+        while True:
+            time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+            changed = self.poll()
+            if changed or timeout is not None:
+                return changed
+
+
+class InotifyWatcher(Watcher):
+    def __init__(self, roots):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs = {}
+        for root in roots:
+            self.add_tree(root)
+
+    def add_tree(self, root):
+        for dirpath, _, _ in os.walk(root):
+            wd = self._add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd >= 0:
+                self.dirs[wd] = dirpath
+
+    def wait(self, timeout=None):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed = None
+                    continue
+                directory = self.dirs.get(wd)
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                if directory is None:
+                    continue
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # files may have been created in it before the watch was added
+                    path = os.path.join(directory, os.fsdecode(name))
+                    self.add_tree(path)
+                if changed is not None:
+                    changed.add(directory)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _fd_limit():
+    """Raise the soft limit on open files as far as allowed; returns it."""
+    import resource
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # macOS refuses limits above kern.maxfilesperproc even if `hard` is unlimited
+    for limit in (hard, 1 << 20, 1 << 16, 10240, 4096):
+        if limit == resource.RLIM_INFINITY or limit <= soft or (hard != resource.RLIM_INFINITY and limit > hard):
+            continue
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+            return limit
+        except (ValueError, OSError):
+            continue
+    return soft
+
+
+class KqueueWatcher(Watcher):
+    """Watches directories, and the files `files` accepts, with kqueue vnode events."""
+
+    def __init__(self, roots, files=None):
+        self.files = files
+        self.kq = select.kqueue()
+        self.max_fds = _fd_limit() - RESERVED_FDS
+        self.watched = {}
+        self.fds = {}
+        # set once a descriptor could not be opened; every wait then asks for a rescan
+        self.overflowed = False
+        try:
+            for root in roots:
+                self.add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add(self, path, is_dir):
+        if path in self.watched:
+            return
+        if len(self.fds) >= self.max_fds:
+            raise OSError(errno.EMFILE, 'too many files to watch', path)
+        try:
+            fd = os.open(path, O_EVTONLY)
+        except OSError as e:
+            if e.errno in (errno.EMFILE, errno.ENFILE):
+                raise
+            return
+        event = select.kevent(
+            fd, filter=select.KQ_FILTER_VNODE,
+            flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR, fflags=VNODE_MASK,
+        )
+        self.kq.control([event], 0, 0)
+        self.watched[path] = fd
+        self.fds[fd] = (path, is_dir)
+
+    def _remove(self, fd):
+        path, _ = self.fds.pop(fd)
+        self.watched.pop(path, None)
+        os.close(fd)
+
+    def _add_entries(self, directory):
+        """Watch the entries of `directory` not watched yet."""
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in self.watched:
+                        self.add_tree(entry.path)
+                elif self.files is not None and self.files(entry.name):
+                    self._add(entry.path, False)
+            except OSError as e:
+                if e.errno not in (errno.EMFILE, errno.ENFILE):
+                    continue
+                raise
+
+    def add_tree(self, root):
+        self._add(root, True)
+        self._add_entries(root)
+
+    def wait(self, timeout=None):
+        events = self.kq.control(None, 256, timeout)
+        changed = set()
+        while events:
+            for event in events:
+                if event.ident not in self.fds:
+                    continue
+                path, is_dir = self.fds[event.ident]
+                try:
+                    if event.fflags & (NOTE_DELETE | NOTE_RENAME | NOTE_REVOKE):
+                        self._remove(event.ident)
+                        # replaced rather than removed, e.g. by an atomic save
+                        if is_dir and os.path.isdir(path):
+                            self.add_tree(path)
+                        elif not is_dir and os.path.isfile(path):
+                            self._add(path, False)
+                    if not is_dir:
+                        changed.add(os.path.dirname(path))
+                        continue
+                    changed.add(path)
+                    if os.path.isdir(path):
+                        self._add_entries(path)
+                except OSError:
+                    self.overflowed = True
+            events = self.kq.control(None, 256, 0)
+        if self.overflowed and changed:
+            return None
+        return changed
+
+    def close(self):
+        for fd in list(self.fds):
+            self._remove(fd)
+        if self.kq is not None:
+            self.kq.close()
+            self.kq = None
+
+
+def open_watcher(roots, poll=False, interval=5.0, files=None, kqueue=False):
+    """Event-based watcher for `roots` if possible, or a polling one.
+
+    `files` tells which file names to watch for changes in place. kqueue is
+    only used if `kqueue` is set.
+    """
+    if not poll and kqueue and hasattr(select, 'kqueue'):
+        try:
+            return KqueueWatcher(roots, files)
+        except OSError:
+            pass
+    elif not poll and hasattr(select, 'select') and ctypes.util.find_library('c'):
+        try:
+            return InotifyWatcher(roots)
+        except (AttributeError, OSError):
+            pass
+    return PollingWatcher(roots, interval, files)
@@ -0,0 +1,323 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import loctable as lt
+
+# Exports all translations of an app bundle at once: every .loctable becomes a
+# table whose rows are its keys, and every NIB of the base locale becomes a
+# table whose rows are its strings, aligned with the same NIB of all other
+# .lproj directories. Each table stores one column per locale, so the file can
+# be memory-mapped and only the columns of the locales in use are ever read.
+#
+# Layout (little-endian):
+#   magic, u32 version, u32 header size, JSON header, padding to 8 bytes,
+#   then the column blocks, each holding a u32 row count, row count + 1 u32
+#   offsets into the UTF-8 data that follows, and the data.
+# The header lists the tables with the block of their keys and of each locale
+# column; blocks are given as (offset, size) relative to the first block. A
+# column that is the keys themselves (the base locale of a NIB) refers to the
+# block of the keys.
+# Missing translations are stored as empty strings.
+
+MAGIC = b'LOCMATRX'
+VERSION = 1
+PREAMBLE = struct.Struct('<8sII')
+SUFFIX = '.locmatrix'
+
+
+def _align(size):
+    return -(-size // 8) * 8
+
+
+def _column_block(strings):
+    data = [string.encode('utf-8') for string in strings]
+    offsets = array('I', [0])
+    for item in data:
+        offsets.append(offsets[-1] + len(item))
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return struct.pack('<I', len(data)) + offsets.tobytes() + b''.join(data)
+
+
+def write_matrix(path, tables, meta=None):
+    """Write `tables`, a list of (name, keys, {locale: values}), to `path`.
+
+    Columns that are the `keys` list itself are stored once, as the keys.
+    """
+    blocks, positions, entries = [], [], []
+
+    def add(strings):
+        block = _column_block(strings)
+        offset = positions[-1][0] + _align(positions[-1][1]) if positions else 0
+        positions.append((offset, len(block)))
+        blocks.append(block)
+        return len(blocks) - 1
+
+    for name, keys, columns in tables:
+        keys_block = add(keys)
+        entries.append({
+            'name': name,
+            'rows': len(keys),
+            'keys': keys_block,
+            'columns': {
+                locale: keys_block if values is keys else add(values) for locale, values in columns.items()
+            },
+        })
+    header = dict(meta or {})
+    header['locales'] = sorted({locale for entry in entries for locale in entry['columns']})
+    header['tables'] = entries
+    header['blocks'] = positions
+    encoded = json.dumps(header, ensure_ascii=False).encode('utf-8')
+
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as fp:
+        fp.write(PREAMBLE.pack(MAGIC, VERSION, len(encoded)) + encoded)
+        start = _align(fp.tell())
+        for (offset, _), block in zip(positions, blocks):
+            fp.write(b'\0' * (start + offset - fp.tell()))
+            fp.write(block)
+    os.replace(tmp, path)
+
+
+class LocaleMatrix:
+    """Read-only view of a matrix file; columns are decoded on first use."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError('not a locale matrix (version %d): %s' % (VERSION, path))
+        self.header = json.loads(self._mm[PREAMBLE.size:PREAMBLE.size + size].decode('utf-8'))
+        self._start = _align(PREAMBLE.size + size)
+        self._tables = {table['name']: table for table in self.header['tables']}
+        self._columns = {}
+
+    @property
+    def locales(self):
+        return self.header['locales']
+
+    @property
+    def tables(self):
+        return list(self._tables)
+
+    def _offsets(self, block):
+        position = self._start + self.header['blocks'][block][0]
+        count, = struct.unpack_from('<I', self._mm, position)
+        return position + 4 + 4 * (count + 1), count, position + 4
+
+    def _column(self, block):
+        if block not in self._columns:
+            data, count, offsets_at = self._offsets(block)
+            offsets = array('I')
+            offsets.frombytes(self._mm[offsets_at:data])
+            if sys.byteorder == 'big':
+                offsets.byteswap()
+            raw = self._mm[data:data + offsets[-1]]
+            self._columns[block] = [raw[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+        return self._columns[block]
+
+    def keys(self, table):
+        return self._column(self._tables[table]['keys'])
+
+    def column(self, table, locale):
+        """Strings of `locale` in the rows of `table`, or None if it has no such column."""
+        block = self._tables[table]['columns'].get(locale)
+        return None if block is None else self._column(block)
+
+    def value(self, table, locale, row):
+        """One string of a column, without decoding the rest of it."""
+        block = self._tables[table]['columns'].get(locale)
+        if block is None:
+            return None
+        data, count, offsets_at = self._offsets(block)
+        if not 0 <= row < count:
+            raise IndexError(row)
+        start, end = struct.unpack_from('<II', self._mm, offsets_at + 4 * row)
+        return self._mm[data + start:data + end].decode('utf-8')
+
+    def table_data(self, table, locales):
+        """Strings tables of `locales` in the format of loctable.load()."""
+        keys = self.keys(table)
+        data = {}
+        for locale in locales:
+            column = self.column(table, locale)
+            if column is not None:
+                data[locale] = {key: value for key, value in zip(keys, column) if value}
+        return data
+
+    def localize(self, string, lang, delocalize=False):
+        """Translation of `string` in the first table that has one, or None."""
+        for table in self._tables:
+            data = self.table_data(table, [lang] + lt.EN_LOCALES)
+            result = (lt.delocalize if delocalize else lt.localize)(data, string, lang)
+            if result is not None:
+                return result
+        return None
+
+    def close(self):
+        self._columns.clear()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def loctable_tables(resource_dir, locales=None):
+    for name in sorted(os.listdir(resource_dir)):
+        if not name.endswith('.loctable'):
+            continue
+        data = lt.read_plist(os.path.join(resource_dir, name))
+        keys = sorted({key for table in data.values() if isinstance(table, dict) for key in table})
+        columns = {}
+        for locale, table in data.items():
+            if not isinstance(table, dict) or (locales is not None and locale not in locales
+                                               and locale not in lt.EN_LOCALES):
+                continue
+            columns[locale] = [table.get(key) if isinstance(table.get(key), str) else '' for key in keys]
+        yield 'loctable/' + name, keys, columns
+
+
+def nib_tables(resource_dir, locales=None, skipped=None):
+    """Tables of the NIBs in `resource_dir`.
+
+    NIBs and locales that cannot be parsed are left out and, if `skipped` is
+    given, recorded in it as {table: {locale: error}}.
+    """
+    from localebundle import base_locale, locale_dirs, nib_file
+    from nibarchive import align_strings, iter_strings
+    from nib_parse import load_archive
+
+    skipped = {} if skipped is None else skipped
+    found = locale_dirs(resource_dir)
+    base = base_locale(found)
+    if base is None:
+        return
+    base_dir = os.path.join(resource_dir, base + '.lproj')
+    for name in sorted(os.listdir(base_dir)):
+        base_path = nib_file(os.path.join(base_dir, name)) if name.endswith('.nib') else None
+        if base_path is None:
+            continue
+        table = 'nib/' + name[:-len('.nib')]
+        try:
+            base_archive = load_archive(base_path)
+        except Exception as e:
+            skipped.setdefault(table, {})[base] = str(e)
+            continue
+        aligned = {}
+        for locale in found:
+            if locale == base or (locales is not None and locale not in locales):
+                continue
+            path = nib_file(os.path.join(resource_dir, locale + '.lproj', name))
+            if path is not None:
+                try:
+                    aligned[locale] = align_strings(base_archive, load_archive(path))
+                except Exception as e:
+                    skipped.setdefault(table, {})[locale] = str(e)
+        # rows are the base strings, in archive order, translated in some locale
+        keys = [string for string in dict.fromkeys(iter_strings(base_archive))
+                if any(string in mapping for mapping in aligned.values())]
+        columns = {base: keys}
+        for locale, mapping in aligned.items():
+            columns[locale] = [mapping.get(key, '') for key in keys]
+        yield table, keys, columns
+
+
+def export(app, path, locales=None):
+    """Write the matrix of all translations of `app` to `path`.
+
+    Locales of NIBs that could not be parsed are listed under `skipped` in the
+    header of the matrix.
+    """
+    from localebundle import bundle_identifier
+    from localecache import bundle_fingerprint
+
+    resource_dir = os.path.join(app, 'Contents', 'Resources')
+    skipped = {}
+    tables = list(loctable_tables(resource_dir, locales)) + list(nib_tables(resource_dir, locales, skipped))
+    write_matrix(path, tables, {
+        'app': os.path.abspath(app),
+        'bundle': bundle_identifier(app),
+        'fingerprint': bundle_fingerprint(os.path.abspath(app)),
+        'skipped': skipped,
+    })
+    return path
+
+
+def matrix_sources(app):
+    resource_dir = os.path.join(app, 'Contents', 'Resources')
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(resource_dir):
+        for name in filenames:
+            if name.endswith('.loctable') and dirpath == resource_dir or name.endswith('.nib'):
+                sources.append(os.path.join(dirpath, name))
+    return sorted(sources)
+
+
+def cached_export(app, cache_root, locales=None):
+    """Path of the matrix of `app` in the locale cache, exporting it if stale."""
+    from localebundle import bundle_identifier
+    from localecache import ArtifactCache, name_digest
+
+    app = os.path.abspath(app)
+    bundle_id = bundle_identifier(app) or os.path.basename(app)
+    suffix = '' if locales is None else '-' + '+'.join(sorted(locales))
+    name = 'matrix/%s-%s%s%s' % (bundle_id, name_digest(app), suffix, SUFFIX)
+    return ArtifactCache(cache_root).fetch(
+        name, matrix_sources(app), lambda tmp: export(app, tmp, locales), bundle=app,
+    )
+
+
+def main(cmd=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Export all translations of an app into a memory-mappable matrix, and look them up."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p_export = subparsers.add_parser("export", help="Export the translations of an app bundle.")
+    p_export.add_argument("app", help="Path of the .app bundle.")
+    target = p_export.add_mutually_exclusive_group(required=True)
+    target.add_argument("-o", "--output", help="Path of the matrix file.")
+    target.add_argument("-c", "--cache", help="Root of the locale cache to export into.")
+    p_export.add_argument(
+        "-l", "--locale", action="append", dest="locales",
+        help="Only export this locale (repeatable; English locales are always included).",
+    )
+
+    p_lookup = subparsers.add_parser("lookup", help="Translate a string using a matrix file.")
+    p_lookup.add_argument("matrix", help="Path of the matrix file.")
+    p_lookup.add_argument("string")
+    p_lookup.add_argument("lang")
+    p_lookup.add_argument("-d", "--delocalize", action="store_true", help="Translate back to English.")
+
+    args = parser.parse_args(cmd)
+    if args.command == "export":
+        path = export(args.app, args.output, args.locales) if args.output \
+            else cached_export(args.app, args.cache, args.locales)
+        if path is None:
+            sys.exit(1)
+        with LocaleMatrix(path) as matrix:
+            for table, errors in sorted(matrix.header.get('skipped', {}).items()):
+                for locale, error in sorted(errors.items()):
+                    print(f"Skipped {table} ({locale}): {error}", file=sys.stderr)
+        print(path, end="")
+    else:
+        with LocaleMatrix(args.matrix) as matrix:
+            result = matrix.localize(args.string, args.lang, args.delocalize)
+        if result is None:
+            sys.exit(1)
+        print(result, end="")
+
+
+if __name__ == "__main__":
+    main()
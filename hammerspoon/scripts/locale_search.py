@@ -0,0 +1,251 @@
+import os
+import sys
+
+# Searches a string in many localization files at once. Candidates are given in
+# priority order (preferential files first, then all the rest); the result is
+# the hit of the candidate with the highest priority, as if they had been
+# probed one after another.
+#
+# Probes parse plists and NIBs in pure Python and hold the GIL, so threads
+# would not overlap them. The preferential candidate is probed first on its
+# own, then every candidate whose artifacts are already in the locale cache,
+# which costs a JSON read each. Only if that finds nothing before them are the
+# cold candidates fanned out to worker processes, and only if there are enough
+# of them to pay for starting the workers; the workers still probing once the
+# winner is known are killed, and the cache sweeps what they leave behind.
+# asyncio and multiprocessing are imported only when they are used.
+
+# below this many cold candidates, starting worker processes costs more than it saves
+PROCESS_THRESHOLD = 8
+
+
+def probe_loctable(path, string, lang, cache=None, delocalize=False):
+    import loctable as lt
+
+    data = lt.load(path, [lang] + lt.EN_LOCALES, cache)
+    return (lt.delocalize if delocalize else lt.localize)(data, string, lang)
+
+
+def loctable_is_warm(path, string, lang, cache=None, delocalize=False):
+    """Whether :func:`probe_loctable` would only read slices already in `cache`."""
+    import loctable as lt
+
+    return cache is not None and all(cache.is_fresh(lt.slice_name(path, l)) for l in [lang] + lt.EN_LOCALES)
+
+
+def probe_nib(base_path, target_path, string, delocalize=False, cache=None):
+    import json
+    from localeindex import NormalizedIndex, redecorate
+    from nib_parse import alignment_cache_name, load_archive, resolve_nib, write_alignment
+
+    base_path, target_path = resolve_nib(base_path), resolve_nib(target_path)
+    if base_path is None or target_path is None:
+        return None
+    # NIBArchive files and keyed archive plists alike
+    if cache is None:
+        from nibarchive import align_strings
+
+        aligned = align_strings(load_archive(base_path), load_archive(target_path))
+    else:
+        cached = cache.fetch(
+            alignment_cache_name(base_path, target_path),
+            [base_path, target_path],
+            lambda tmp: write_alignment(base_path, target_path, tmp),
+        )
+        with open(cached, "r", encoding="utf-8") as fp:
+            aligned = json.load(fp)
+    if delocalize:
+        aligned = {v: k for k, v in reversed(list(aligned.items()))}
+
+    matches = NormalizedIndex(aligned.items()).lookup(string)
+    if matches:
+        matched, result = matches[0]
+        return redecorate(string, matched, result)
+    return None
+
+
+def nib_is_warm(base_path, target_path, string, delocalize=False, cache=None):
+    """Whether :func:`probe_nib` would only read an alignment already in `cache`."""
+    from nib_parse import alignment_cache_name, resolve_nib
+
+    base_path, target_path = resolve_nib(base_path), resolve_nib(target_path)
+    if cache is None or base_path is None or target_path is None:
+        return False
+    return cache.is_fresh(alignment_cache_name(base_path, target_path))
+
+
+class _ProcessPool:
+    """Runs probes in worker processes that can be killed mid-probe."""
+
+    def __init__(self, jobs):
+        import multiprocessing
+
+        self.pool = multiprocessing.Pool(jobs)
+
+    def submit(self, loop, fn, *args):
+        future = loop.create_future()
+
+        def resolve(result=None, error=None):
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        self.pool.apply_async(
+            fn, args,
+            callback=lambda r: loop.call_soon_threadsafe(resolve, r),
+            error_callback=lambda e: loop.call_soon_threadsafe(resolve, None, e),
+        )
+        return future
+
+    def shutdown(self):
+        self.pool.terminate()
+
+
+async def search(probe, candidates, jobs=None):
+    """First hit of `probe` over `candidates` (argument tuples) by priority.
+
+    All candidates are probed concurrently in worker processes. Returns a tuple
+    of the index of the candidate and its result, or None.
+    """
+    import asyncio
+
+    if not candidates:
+        return None
+    pool = _ProcessPool(min(jobs or os.cpu_count() or 1, len(candidates)))
+    loop = asyncio.get_running_loop()
+    futures = [pool.submit(loop, probe, *args) for args in candidates]
+    try:
+        for index, future in enumerate(futures):
+            try:
+                result = await future
+            except Exception:
+                continue
+            if result is not None:
+                return index, result
+        return None
+    finally:
+        for future in futures:
+            future.cancel()
+        pool.shutdown()
+
+
+def _probe(probe, args):
+    try:
+        return probe(*args)
+    except Exception:
+        return None
+
+
+def run_search(probe, candidates, jobs=None, is_warm=None):
+    """First hit of `probe` over `candidates` by priority, like :func:`search`.
+
+    `is_warm` tells, given the arguments of a probe, whether it would only read
+    the cache; those candidates are probed in this process before any other.
+    """
+    if not candidates:
+        return None
+    result = _probe(probe, candidates[0])
+    if result is not None:
+        return 0, result
+
+    rest = range(1, len(candidates))
+    warm = [index for index in rest if is_warm is not None and is_warm(*candidates[index])]
+    found = None
+    for index in warm:
+        result = _probe(probe, candidates[index])
+        if result is not None:
+            found = index, result
+            break
+    # only cold candidates of higher priority than a warm hit can still win
+    limit = len(candidates) if found is None else found[0]
+    cold = [index for index in rest if index < limit and index not in warm]
+
+    jobs = min(jobs or os.cpu_count() or 1, len(cold))
+    if len(cold) >= PROCESS_THRESHOLD and jobs > 1:
+        import asyncio
+
+        hit = asyncio.run(search(probe, [candidates[index] for index in cold], jobs))
+        if hit is not None:
+            return cold[hit[0]], hit[1]
+        return found
+    for index in cold:
+        result = _probe(probe, candidates[index])
+        if result is not None:
+            return index, result
+    return found
+
+
+def open_cache(cache_root):
+    if cache_root is None:
+        return None
+    from localecache import ArtifactCache
+
+    # one instance for all probes, so that each record is read at most once
+    return ArtifactCache(cache_root)
+
+
+def search_loctables(files, string, lang, cache_root=None, delocalize=False, jobs=None):
+    cache = open_cache(cache_root)
+    candidates = [(path, string, lang, cache, delocalize) for path in files]
+    return run_search(probe_loctable, candidates, jobs, loctable_is_warm)
+
+
+def search_nibs(base_dir, target_dir, stems, string, delocalize=False, cache_root=None, jobs=None):
+    cache = open_cache(cache_root)
+    candidates = [
+        (
+            os.path.join(base_dir, stem + ".nib"),
+            os.path.join(target_dir, stem + ".nib"),
+            string, delocalize, cache,
+        )
+        for stem in stems
+    ]
+    return run_search(probe_nib, candidates, jobs, nib_is_warm)
+
+
+def main(cmd=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        description="Search a string in many localization files concurrently."
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-d", "--delocalize", action="store_true", help="Translate back to English.")
+    common.add_argument("-j", "--jobs", type=int, help="Maximum number of concurrent probes.")
+    subparsers = parser.add_subparsers(dest="format", required=True)
+
+    p_loctable = subparsers.add_parser("loctable", parents=[common], help="Search .loctable files.")
+    p_loctable.add_argument("string")
+    p_loctable.add_argument("lang")
+    p_loctable.add_argument("files", nargs="+", help="Loctable files in priority order.")
+    p_loctable.add_argument("-c", "--cache", help="Root of the locale cache.")
+
+    p_nib = subparsers.add_parser("nib", parents=[common], help="Search NIBs of a locale against the base locale.")
+    p_nib.add_argument("string")
+    p_nib.add_argument("base_dir", help="The .lproj directory of the base locale.")
+    p_nib.add_argument("target_dir", help="The .lproj directory of the target locale.")
+    p_nib.add_argument("stems", nargs="+", help="NIB names without extension in priority order.")
+    p_nib.add_argument("-c", "--cache", help="Root of the locale cache.")
+
+    args = parser.parse_args(cmd)
+    if args.format == "loctable":
+        files = args.files
+        found = search_loctables(files, args.string, args.lang, args.cache, args.delocalize, args.jobs)
+    else:
+        files = args.stems
+        found = search_nibs(
+            args.base_dir, args.target_dir, args.stems, args.string,
+            args.delocalize, args.cache, args.jobs,
+        )
+    if found is None:
+        sys.exit(1)
+    index, result = found
+    print(json.dumps({"file": files[index], "result": result}, ensure_ascii=False, default=str), end="")
+
+
+if __name__ == "__main__":
+    main()
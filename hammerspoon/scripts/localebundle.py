@@ -0,0 +1,48 @@
+import os
+
+# Layout of app bundles shared by the tools that walk their localized
+# resources: the bundle identifier, the .lproj directories of the resource
+# directory, and the NIBs in them, which are either NIBArchive files or .nib
+# directories holding a keyed archive.
+
+# NIBs of other locales are aligned against the first of these found, like utils.lua does
+BASE_LOCALES = ['Base', 'en', 'English']
+
+
+def bundle_identifier(app):
+    import plistlib
+
+    try:
+        with open(os.path.join(app, 'Contents', 'Info.plist'), 'rb') as fp:
+            return plistlib.load(fp).get('CFBundleIdentifier')
+    except Exception:
+        return None
+
+
+def locale_dirs(resource_dir):
+    """Locales with an .lproj directory in `resource_dir`, sorted."""
+    try:
+        names = sorted(os.listdir(resource_dir))
+    except OSError:
+        return []
+    return [name[:-len('.lproj')] for name in names if name.endswith('.lproj')]
+
+
+def base_locale(locales):
+    """The locale other locales' NIBs are aligned against, or None."""
+    return next((locale for locale in BASE_LOCALES if locale in locales), None)
+
+
+def nib_file(path):
+    """The archive file of a .nib file or directory, or None."""
+    import nib_parse
+    from nibarchive import is_keyed_archive
+
+    path = nib_parse.resolve_nib(path)
+    try:
+        with open(path, 'rb') as fp:
+            if fp.read(10) == b'NIBArchive' or is_keyed_archive(fp):
+                return path
+    except (OSError, TypeError):
+        pass
+    return None
@@ -0,0 +1,534 @@
+import contextlib
+import fcntl
+import json
+import os
+import re
+import sys
+import time
+import zlib
+
+# Artifacts derived from app bundles (JSON dumps of NIBs, XML conversions,
+# diffs, unpacked .pak directories, loctable slices) are kept under the locale
+# temp dir, e.g. `<root>/<bundleID>/<locale>/<file>.json`. This module records
+# what each artifact was built from so that it can be rebuilt when an app is
+# updated, and keeps the total size of the cache within a budget by evicting
+# the least recently used artifacts.
+#
+# Freshness is checked at bundle granularity first: an artifact built from a
+# bundle stays valid as long as the bundle's Info.plist (size, mtime and
+# version) is unchanged, which costs a single memoized stat per bundle and
+# process. Only when the bundle changed are the sources of the artifact checked
+# one by one (size and mtime, then content hash).
+#
+# What an artifact was built from is kept in a small sidecar next to it
+# (`.<file>.entry`), so a lookup reads only the records of the artifacts it
+# uses, however many apps have been cached. The sidecar's mtime is the
+# artifact's last access time. The total size is kept in `usage.json`; the
+# whole cache is only walked when that exceeds the budget.
+#
+# Every lookup from utils.lua is a new process, so modules only needed to build
+# or evict artifacts are imported where they are used.
+#
+# A process killed while building (search probes are, once a better hit is
+# known) leaves its temporary file behind, or an artifact whose sidecar was
+# never written. Such leftovers are swept, and the total size recounted, at
+# most once per SWEEP_INTERVAL.
+
+ENTRY_SUFFIX = '.entry'
+BUNDLES = '.bundles'
+USAGE = 'usage.json'
+LOCK = '.usage.lock'
+# single manifest of all artifacts written by earlier versions
+LEGACY_MANIFEST = 'manifest.json'
+DEFAULT_BUDGET = 512 * 1024 * 1024
+# access times are only written back when older than this, so that warm hits
+# do not touch the sidecar on every lookup
+ATIME_RESOLUTION = 3600
+SWEEP_INTERVAL = 24 * 3600
+# temporary files of a process that is still running are only swept after this long
+STALE_TEMP_AGE = 24 * 3600
+# artifacts without a sidecar are only swept after this long, so that a build
+# between installing its artifact and writing the sidecar is not raced
+ORPHAN_AGE = 60
+# directories holding only artifacts built by fetch(), so that a file there
+# without a sidecar was left by a build that was killed
+FETCHED_DIRS = ('aligned', 'loctable', 'matrix', 'titles')
+# temporary files of fetch() and write_json(), and artifacts replaced by _install()
+_TEMP = re.compile(r'\.(\d+)\.(?:tmp|old)$')
+
+
+def name_digest(*paths):
+    """Short digest of absolute `paths` to tell artifacts of same-named sources apart."""
+    data = '\0'.join(os.path.abspath(path) for path in paths).encode('utf-8')
+    return '%08x%08x' % (zlib.crc32(data), zlib.adler32(data))
+
+
+def file_hash(path):
+    import hashlib
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def path_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return size
+
+
+def remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        import shutil
+
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def bundle_of(path):
+    """The enclosing .app/.framework/.bundle of `path`, or None."""
+    path = os.path.abspath(path)
+    outermost = None
+    while path != os.path.dirname(path):
+        if path.endswith(('.app', '.framework', '.bundle')):
+            outermost = path
+        path = os.path.dirname(path)
+    return outermost
+
+
+def info_plist_of(bundle):
+    for candidate in ('Contents/Info.plist', 'Resources/Info.plist', 'Info.plist'):
+        path = os.path.join(bundle, candidate)
+        if os.path.exists(path):
+            return path
+
+
+def read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w', encoding='utf-8') as fp:
+        json.dump(data, fp, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def source_fingerprint(path, with_hash=False):
+    st = os.stat(path)
+    fingerprint = {'path': os.path.abspath(path), 'mtime': st.st_mtime_ns, 'size': st.st_size}
+    if with_hash and not os.path.isdir(path):
+        fingerprint['hash'] = file_hash(path)
+    return fingerprint
+
+
+_bundle_fingerprints = {}
+
+
+def bundle_fingerprint(bundle, recorded=None):
+    """Version, mtime and size of a bundle's Info.plist, memoized per process.
+
+    If the Info.plist still has the mtime and size of the `recorded` fingerprint,
+    that is returned as is without parsing the plist again.
+    """
+    if bundle in _bundle_fingerprints:
+        return _bundle_fingerprints[bundle]
+    fingerprint = None
+    info_plist = info_plist_of(bundle)
+    if info_plist is not None:
+        st = os.stat(info_plist)
+        if recorded is not None and (recorded.get('mtime'), recorded.get('size')) == (st.st_mtime_ns, st.st_size):
+            _bundle_fingerprints[bundle] = recorded
+            return recorded
+        try:
+            import plistlib
+
+            with open(info_plist, 'rb') as fp:
+                info = plistlib.load(fp)
+            version = '%s (%s)' % (info.get('CFBundleShortVersionString'), info.get('CFBundleVersion'))
+        except Exception:
+            version = None
+        fingerprint = {'version': version, 'mtime': st.st_mtime_ns, 'size': st.st_size}
+    _bundle_fingerprints[bundle] = fingerprint
+    return fingerprint
+
+
+class ArtifactCache:
+    """Cache of artifacts stored below `root`, each recorded in a sidecar.
+
+    Artifacts are addressed by their path relative to `root`.
+    """
+
+    def __init__(self, root, budget=DEFAULT_BUDGET):
+        self.root = os.path.abspath(root)
+        self.budget = budget
+        self._entries = {}
+        self._pending = None
+
+    # records
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def entry_path(self, name):
+        head, tail = os.path.split(self.path(name))
+        return os.path.join(head, '.%s%s' % (tail, ENTRY_SUFFIX))
+
+    def entry(self, name):
+        """Record of the artifact `name`, or None; read once per instance."""
+        if name not in self._entries:
+            self._entries[name] = read_json(self.entry_path(name))
+        return self._entries[name]
+
+    def _write_entry(self, name, entry):
+        write_json(self.entry_path(name), entry)
+        self._entries[name] = entry
+
+    def _remove(self, name):
+        remove_path(self.path(name))
+        remove_path(self.entry_path(name))
+        self._entries[name] = None
+
+    def entries(self, prefix=''):
+        """(name, record, last access) of the artifacts whose name starts with `prefix`."""
+        top = os.path.join(self.root, os.path.dirname(prefix))
+        for dirpath, dirnames, filenames in os.walk(top):
+            artifacts = set()
+            for filename in filenames:
+                if not (filename.startswith('.') and filename.endswith(ENTRY_SUFFIX)):
+                    continue
+                artifact = filename[1:-len(ENTRY_SUFFIX)]
+                artifacts.add(artifact)
+                name = os.path.relpath(os.path.join(dirpath, artifact), self.root).replace(os.sep, '/')
+                if not name.startswith(prefix):
+                    continue
+                sidecar = os.path.join(dirpath, filename)
+                entry = read_json(sidecar)
+                if entry is None:
+                    continue
+                try:
+                    atime = os.stat(sidecar).st_mtime
+                except OSError:
+                    continue
+                yield name, entry, atime
+            # artifacts that are directories and temporary files are not descended into
+            dirnames[:] = [d for d in dirnames if not d.startswith('.') and d not in artifacts]
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Defer size accounting and eviction to the end of the block."""
+        if self._pending is not None:
+            yield self
+            return
+        self._pending = [0, set()]
+        try:
+            yield self
+        finally:
+            (delta, keep), self._pending = self._pending, None
+            if delta or keep:
+                self._account(delta, keep)
+
+    # size budget
+
+    def _lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        fd = os.open(os.path.join(self.root, LOCK), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def _unlock(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _account(self, delta, keep=()):
+        """Add `delta` bytes to the total size and evict if over budget."""
+        if self._pending is not None:
+            self._pending[0] += delta
+            self._pending[1].update(keep)
+            return
+        fd = self._lock()
+        try:
+            self._migrate()
+            usage = read_json(os.path.join(self.root, USAGE)) or {}
+            swept = usage.get('swept', 0)
+            if time.time() - swept > SWEEP_INTERVAL:
+                # the recount already includes `delta`
+                total, swept = self._sweep(), time.time()
+            else:
+                total = usage.get('size', 0) + delta
+            if total > self.budget:
+                total = self._evict(keep)
+            write_json(os.path.join(self.root, USAGE), {'size': max(total, 0), 'swept': swept})
+        finally:
+            self._unlock(fd)
+
+    def sweep(self):
+        """Remove what killed builds left behind and recount the total size now."""
+        fd = self._lock()
+        try:
+            write_json(os.path.join(self.root, USAGE), {'size': self._sweep(), 'swept': time.time()})
+        finally:
+            self._unlock(fd)
+
+    def _sweep(self):
+        """Remove stale temporary files and orphaned artifacts; returns the total size."""
+        now = time.time()
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            sidecars = {
+                filename[1:-len(ENTRY_SUFFIX)] for filename in filenames
+                if filename.startswith('.') and filename.endswith(ENTRY_SUFFIX)
+            }
+            fetched = os.path.relpath(dirpath, self.root).split(os.sep)[0] in FETCHED_DIRS
+            for filename in dirnames + filenames:
+                path = os.path.join(dirpath, filename)
+                match = _TEMP.search(filename)
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                if match is not None:
+                    if not pid_running(int(match.group(1))) or now - st.st_mtime > STALE_TEMP_AGE:
+                        remove_path(path)
+                elif filename in sidecars:
+                    continue
+                elif filename.endswith(ENTRY_SUFFIX) and filename.startswith('.'):
+                    if not os.path.lexists(os.path.join(dirpath, filename[1:-len(ENTRY_SUFFIX)])):
+                        remove_path(path)
+                elif fetched and filename in filenames and not filename.startswith('.') \
+                        and now - st.st_ctime > ORPHAN_AGE:
+                    remove_path(path)
+            # artifacts that are directories are not descended into
+            dirnames[:] = [d for d in dirnames if d not in sidecars and os.path.isdir(os.path.join(dirpath, d))]
+        self._entries.clear()
+        return sum(entry.get('size', 0) for _, entry, _ in self.entries())
+
+    def _evict(self, keep=()):
+        """Remove least recently used artifacts until within budget; returns the total size."""
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(entry.get('size', 0) for _, entry, _ in entries)
+        for name, entry, _ in entries:
+            if total <= self.budget:
+                break
+            if name in keep:
+                continue
+            total -= entry.get('size', 0)
+            self._remove(name)
+        return total
+
+    def _migrate(self):
+        """Drop the artifacts listed in a manifest of an earlier version.
+
+        Their sidecars are missing, so they would never be fresh again; artifacts
+        rebuilt since then have sidecars and are kept.
+        """
+        legacy = os.path.join(self.root, LEGACY_MANIFEST)
+        manifest = read_json(legacy) if os.path.exists(legacy) else None
+        if manifest is None:
+            return
+        for name in manifest.get('entries', {}):
+            if not os.path.exists(self.entry_path(name)):
+                remove_path(self.path(name))
+        remove_path(legacy)
+
+    # freshness
+
+    def is_fresh(self, name):
+        entry = self.entry(name)
+        if entry is None or not os.path.exists(self.path(name)):
+            return False
+
+        bundle = entry.get('bundle')
+        if bundle is not None and entry.get('bundle_fingerprint') is not None:
+            if bundle_fingerprint(bundle, entry['bundle_fingerprint']) == entry['bundle_fingerprint']:
+                return True
+            if not entry.get('sources'):
+                # artifacts of unknown origin live and die with their bundle
+                return False
+
+        for recorded in entry.get('sources', []):
+            try:
+                current = source_fingerprint(recorded['path'])
+            except OSError:
+                return False
+            if current['mtime'] == recorded['mtime'] and current['size'] == recorded['size']:
+                continue
+            if current['size'] != recorded['size'] or 'hash' not in recorded:
+                return False
+            if file_hash(recorded['path']) != recorded['hash']:
+                return False
+        # sources unchanged although the bundle was touched: refresh the stamps
+        if bundle is not None and entry.get('bundle_fingerprint') != bundle_fingerprint(bundle):
+            self._restamp(name)
+        return True
+
+    def _restamp(self, name):
+        entry = dict(self.entry(name))
+        entry['sources'] = [source_fingerprint(s['path'], with_hash=True) for s in entry.get('sources', [])]
+        entry['bundle_fingerprint'] = bundle_fingerprint(entry['bundle'])
+        self._write_entry(name, entry)
+
+    def _touch(self, name):
+        sidecar = self.entry_path(name)
+        now = time.time()
+        try:
+            if now - os.stat(sidecar).st_mtime > ATIME_RESOLUTION:
+                os.utime(sidecar, (now, now))
+        except OSError:
+            pass
+
+    # building
+
+    def fetch(self, name, sources, build, bundle=None, force=False):
+        """Path of the artifact `name`, (re)building it from `sources` if stale.
+
+        `build` is called with a temporary path to write the artifact to (a file,
+        or a directory it creates itself); the result is moved into place
+        atomically. With `force`, it is rebuilt even if it looks fresh. Returns
+        None if building failed.
+        """
+        if not force and self.is_fresh(name):
+            self._touch(name)
+            return self.path(name)
+
+        if bundle is None and sources:
+            bundle = bundle_of(sources[0])
+        dest = self.path(name)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(dest), '.%s.%d.tmp' % (os.path.basename(dest), os.getpid()))
+        remove_path(tmp)
+        try:
+            if build(tmp) is False or not os.path.lexists(tmp):
+                remove_path(tmp)
+                return None
+        except Exception:
+            remove_path(tmp)
+            raise
+        self._install(tmp, dest)
+        self.register(name, sources, bundle)
+        return dest
+
+    def _install(self, tmp, dest):
+        if os.path.isdir(tmp) and os.path.lexists(dest):
+            old = '%s.%d.old' % (dest, os.getpid())
+            os.replace(dest, old)
+            os.replace(tmp, dest)
+            remove_path(old)
+        else:
+            if os.path.isdir(dest):
+                remove_path(dest)
+            os.replace(tmp, dest)
+
+    def register(self, name, sources, bundle=None):
+        """Record fingerprints for an artifact already written to `path(name)`."""
+        previous = self.entry(name)
+        entry = {
+            'sources': [source_fingerprint(s, with_hash=True) for s in sources],
+            'bundle': bundle,
+            'bundle_fingerprint': bundle_fingerprint(bundle) if bundle else None,
+            'size': path_size(self.path(name)),
+        }
+        self._write_entry(name, entry)
+        self._account(entry['size'] - (previous or {}).get('size', 0), {name})
+
+    def dependents(self, path, prefix=''):
+        """Names of the artifacts starting with `prefix` built from the file `path`."""
+        path = os.path.abspath(path)
+        return [
+            name for name, entry, _ in self.entries(prefix)
+            if any(source.get('path') == path for source in entry.get('sources', []))
+        ]
+
+    # invalidation
+
+    def invalidate(self, prefix=''):
+        """Drop all artifacts whose name starts with `prefix`."""
+        freed = 0
+        for name, entry, _ in list(self.entries(prefix)):
+            self._remove(name)
+            freed += entry.get('size', 0)
+        if freed:
+            self._account(-freed)
+
+    def check_bundle(self, bundle_id, app_path):
+        """Invalidate everything under `<root>/<bundle_id>` if the app changed.
+
+        Artifacts written there by other tools are adopted into the cache, so
+        that they are covered by the size budget and by later invalidations.
+        Returns True if the cache of the bundle was outdated.
+        """
+        app_path = os.path.abspath(app_path)
+        record = os.path.join(self.root, BUNDLES, bundle_id + '.json')
+        recorded = read_json(record)
+        current = bundle_fingerprint(app_path, recorded)
+        outdated = recorded is not None and recorded != current
+        bundle_dir = self.path(bundle_id)
+
+        delta = 0
+        if outdated:
+            delta -= sum(entry.get('size', 0) for _, entry, _ in self.entries(bundle_id + '/'))
+            remove_path(bundle_dir)
+        if recorded != current:
+            write_json(record, current)
+        if os.path.isdir(bundle_dir):
+            for locale in os.listdir(bundle_dir):
+                locale_dir = os.path.join(bundle_dir, locale)
+                if not os.path.isdir(locale_dir):
+                    continue
+                for artifact in os.listdir(locale_dir):
+                    name = '%s/%s/%s' % (bundle_id, locale, artifact)
+                    if artifact.startswith('.') or os.path.exists(self.entry_path(name)):
+                        continue
+                    entry = {
+                        'sources': [], 'bundle': app_path, 'bundle_fingerprint': current,
+                        'size': path_size(os.path.join(locale_dir, artifact)),
+                    }
+                    self._write_entry(name, entry)
+                    delta += entry['size']
+        if delta:
+            self._account(delta)
+        return outdated
+
+
+def main(argv):
+    if len(argv) < 2:
+        sys.exit(1)
+    command, args = argv[1], argv[2:]
+    if command == 'check' and len(args) >= 3:
+        root, bundle_id, app_path = args[:3]
+        if ArtifactCache(root).check_bundle(bundle_id, app_path):
+            print('outdated', end='')
+    elif command == 'invalidate' and len(args) >= 1:
+        ArtifactCache(args[0]).invalidate(args[1] if len(args) > 1 else '')
+    elif command == 'sweep' and len(args) >= 1:
+        ArtifactCache(args[0]).sweep()
+    else:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
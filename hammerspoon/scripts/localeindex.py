@@ -0,0 +1,117 @@
+import re
+
+# Menu titles found in the wild differ from the strings stored in localization
+# resources in a handful of cosmetic ways: trailing ellipses ("..." vs "…"),
+# ampersand mnemonics ("&Save", "保存(&S)"), non-breaking spaces, curly quotes
+# and trailing colons. Instead of retrying the whole lookup chain for each
+# variant, resources are indexed under a canonical form so that a single probe
+# resolves all of them, while every entry still maps back to the exact original
+# (text, payload) pair.
+
+ELLIPSES = ('...', '\u2026')
+COLONS = (':', '\uff1a')
+
+_TRANSLATION = str.maketrans({
+    '\u00a0': ' ',  # no-break space
+    '\u2007': ' ',  # figure space
+    '\u202f': ' ',  # narrow no-break space
+    '\u201c': '"',
+    '\u201d': '"',
+    '\u201e': '"',
+    '\u2018': "'",
+    '\u2019': "'",
+    '\u201a': "'",
+})
+_MNEMONIC_SUFFIX = re.compile(r'\s*\(&[^)]\)')
+# Mnemonics start a word ("&Save", "Save &As"); "&&" is an escaped ampersand,
+# and "Find & Replace", "AT&T" and "R&D" hold literal ones
+_MNEMONIC = re.compile(r'&&|(?<!\w)&(\S)')
+
+
+def has_mnemonics(text: str) -> bool:
+    return strip_mnemonics(text) != text
+
+
+def strip_mnemonics(text: str) -> str:
+    """Remove ampersand mnemonics, turning escaped ampersands ("&&") into "&"."""
+    if '&' not in text:
+        return text
+    return _MNEMONIC.sub(lambda m: m.group(1) or '&', _MNEMONIC_SUFFIX.sub('', text))
+
+
+def split_suffix(text: str) -> tuple[str, str]:
+    """Split trailing ellipsis and colon decorations off `text`."""
+    stem = text.rstrip()
+    while True:
+        for suffix in ELLIPSES + COLONS:
+            if stem.endswith(suffix):
+                stem = stem[:-len(suffix)].rstrip()
+                break
+        else:
+            break
+    return stem, text[len(stem):]
+
+
+def normalize(text: str) -> str:
+    """Canonical form of a UI string used as the index key."""
+    text = strip_mnemonics(text.translate(_TRANSLATION))
+    text = ' '.join(text.split())
+    return split_suffix(text)[0]
+
+
+def redecorate(query: str, matched: str, value: str) -> str:
+    """Carry the decorations of `query` over to the translation of `matched`.
+
+    When the query had a trailing ellipsis or colon the matched resource entry
+    lacks, it is appended to the translated value, and when the entry had one
+    the query lacks, it is removed from the value; mnemonics are dropped from the
+    value when the matched entry had them but the query did not.
+    """
+    if not isinstance(value, str):
+        return value
+    if has_mnemonics(matched) and not has_mnemonics(query):
+        value = strip_mnemonics(value)
+    query_suffix = split_suffix(query)[1]
+    matched_suffix = split_suffix(matched)[1]
+    if query_suffix and not matched_suffix and not split_suffix(value)[1]:
+        value = value.rstrip() + query_suffix.lstrip()
+    elif matched_suffix and not query_suffix:
+        value = split_suffix(value)[0]
+    return value
+
+
+class NormalizedIndex:
+    """Maps strings to payloads, matching exactly first and canonically second."""
+
+    def __init__(self, pairs=()) -> None:
+        self._exact = {}
+        self._normalized = {}
+        for text, payload in pairs:
+            self.add(text, payload)
+
+    def add(self, text: str, payload) -> None:
+        if not isinstance(text, str):
+            return
+        key = normalize(text)
+        # empty strings and bare punctuation would match any other such string
+        if not key:
+            return
+        self._exact.setdefault(text, []).append(payload)
+        self._normalized.setdefault(key, []).append((text, payload))
+
+    def get_exact(self, query: str) -> list:
+        return [(query, payload) for payload in self._exact.get(query, [])]
+
+    def get_normalized(self, query: str) -> list:
+        key = normalize(query)
+        return self._normalized.get(key, []) if key else []
+
+    def lookup(self, query: str) -> list:
+        """All (original text, payload) pairs matching `query`, exact hits first."""
+        return self.get_exact(query) or self.get_normalized(query)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def __contains__(self, query: str) -> bool:
+        return bool(self.lookup(query))
@@ -0,0 +1,132 @@
+import json
+import os
+
+from localeindex import NormalizedIndex, redecorate
+
+# A .loctable is a plist holding the strings tables of every language at once,
+# so loading it is much more expensive than loading the one or two languages a
+# lookup needs. With a cache, each language is sliced out into its own JSON
+# artifact the first time it is requested.
+
+EN_LOCALES = ['en', 'English', 'Base', 'en_US', 'en_GB']
+
+
+def slice_name(path, lang):
+    from localecache import name_digest
+
+    return 'loctable/%s-%s/%s.json' % (os.path.basename(path), name_digest(path), lang)
+
+
+def read_plist(path):
+    # plistlib is by far the most expensive import here, and warm lookups only read JSON slices
+    import plistlib
+
+    with open(path, 'rb') as fp:
+        return plistlib.load(fp)
+
+
+def load(path, langs=None, cache=None):
+    """Strings tables of `langs` (all languages if None) in the loctable `path`.
+
+    Languages missing from the loctable are missing from the result.
+    """
+    if cache is None or langs is None:
+        data = read_plist(path)
+        return data if langs is None else {lang: data[lang] for lang in langs if lang in data}
+
+    data = None
+    tables = {}
+
+    def build(lang):
+        def write(tmp):
+            nonlocal data
+            if data is None:
+                data = read_plist(path)
+            with open(tmp, 'w', encoding='utf-8') as fp:
+                # `null` marks languages absent from the loctable
+                json.dump(data.get(lang), fp, ensure_ascii=False, default=str)
+        return write
+
+    for lang in langs:
+        slice_path = cache.fetch(slice_name(path, lang), [path], build(lang))
+        if slice_path is None:
+            continue
+        with open(slice_path, 'r', encoding='utf-8') as fp:
+            table = json.load(fp)
+        if table is not None:
+            tables[lang] = table
+    return tables
+
+
+def warm(path, cache):
+    """Slice every language of the loctable `path` into `cache`.
+
+    Returns the number of slices that had to be (re)built.
+    """
+    data = None
+    built = 0
+
+    def build(lang):
+        def write(tmp):
+            nonlocal built
+            with open(tmp, 'w', encoding='utf-8') as fp:
+                json.dump(data.get(lang), fp, ensure_ascii=False, default=str)
+            built += 1
+        return write
+
+    data = read_plist(path)
+    for lang in list(data) + [en for en in EN_LOCALES if en not in data]:
+        cache.fetch(slice_name(path, lang), [path], build(lang))
+    return built
+
+
+def localize(data, string, lang):
+    """Translation of `string` into `lang` given the tables of a loctable.
+
+    `string` may be a key or an English string; ellipsis, mnemonic and
+    punctuation variants of it are resolved too.
+    """
+    if lang not in data:
+        return None
+
+    if data[lang].get(string):
+        return data[lang][string]
+    elif lang == 'en':
+        for en in ['English', 'Base', 'en_US', 'en_GB']:
+            if en in data and data[en].get(string):
+                return data[en][string]
+
+    en_locales = [en for en in EN_LOCALES if en in data]
+    indices = [NormalizedIndex((v, k) for k, v in data[en].items()) for en in en_locales]
+    for index in indices:
+        for _, key in index.get_exact(string):
+            if data[lang].get(key):
+                return data[lang][key]
+
+    # ellipsis, mnemonic and punctuation variants of the string
+    keys = NormalizedIndex((k, k) for k in data[lang].keys())
+    for matched, key in keys.get_normalized(string):
+        if data[lang].get(key):
+            return redecorate(string, matched, data[lang][key])
+    for index in indices:
+        for matched, key in index.get_normalized(string):
+            if data[lang].get(key):
+                return redecorate(string, matched, data[lang][key])
+    return None
+
+
+def delocalize(data, string, lang):
+    """English string of the `lang` translation `string` given the tables of a loctable."""
+    if lang not in data:
+        return None
+
+    index = NormalizedIndex((v, k) for k, v in data[lang].items())
+    matches = index.lookup(string)
+    if not matches:
+        return None
+    matched, key = matches[0]
+
+    for en in EN_LOCALES:
+        if en in data and key in data[en]:
+            return redecorate(string, matched, data[en][key])
+    return None
@@ -1,21 +1,18 @@
-import plistlib
 import sys
 
+import loctable as lt
+
 if len(sys.argv) < 4:
   sys.exit(1)
 loctable, string, lang = sys.argv[1:4]
 
-with open(loctable, 'rb') as fp:
-  data = plistlib.load(fp)
+cache = None
+if len(sys.argv) > 4:
+  from localecache import ArtifactCache
+  cache = ArtifactCache(sys.argv[4])
+data = lt.load(loctable, [lang] + lt.EN_LOCALES, cache)
 
-try:
-  key = list(data[lang].keys())[list(data[lang].values()).index(string)]
-except ValueError:
+result = lt.delocalize(data, string, lang)
+if result is None:
   sys.exit(1)
-
-for en in ['en', 'English', 'Base', 'en_US', 'en_GB']:
-  if en in data and key in data[en]:
-    print(data[en][key], end='')
-    sys.exit(0)
-
-sys.exit(1)
\ No newline at end of file
+print(result, end='')
@@ -12,15 +12,15 @@
 
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from __future__ import annotations
+
 import os
-import argparse
-import pathlib
-import json
-import datetime
-import dataclasses
-from typing import Any
 
-from nibarchive import NIBArchive, NIBObject, NIBValueType, NIBArchiveParser
+# Loads its submodules on first attribute access
+import nibarchive
+
+# utils.lua spawns this script for every lookup, so anything a subcommand does
+# not always need (argparse aside) is imported inside the functions using it.
 
 # This class contains a simplistic implementation of a NIB-to-Swift converter. It
 # is meant to be used to understand/inspect the structure of stored UI objects.
@@ -36,7 +36,7 @@ from nibarchive import NIBArchive, NIBObject, NIBValueType, NIBArchiveParser
 class NIBObjectPrinter:
     def __init__(
         self,
-        archive: NIBArchive,
+        archive: nibarchive.NIBArchive,
         handler=print,
         indent: str = None,
         print_empty: bool = False,
@@ -48,18 +48,19 @@ class NIBObjectPrinter:
         self.max_depth = max_depth
         self.handler = handler
 
-    def print_object(self, obj: NIBObject) -> None:
+    def print_object(self, obj: nibarchive.NIBObject) -> None:
         self._print(self.archive.objects.index(obj), obj, 3)
 
     def _print(
         self,
         index: int,
-        obj: NIBObject,
+        obj: nibarchive.NIBObject,
         indent_level: int,
         inner=False,
         depth=0,
         key_def=None,
     ) -> None:
+        NIBValueType = nibarchive.NIBValueType
         items = self.archive.get_object_items(obj)
         class_name = self.archive.get_class_name(obj)
         if len(items) == 0 and self.print_empty:
@@ -131,15 +132,109 @@ class FileWriter:
         self.fp.write(" ".join(list(args)) + "\n")
 
 
-class JSONBytesEncoder(json.JSONEncoder):
-    def default(self, o: Any) -> Any:
-        if isinstance(o, bytes):
-            return o.decode("utf-8", errors="replace")
-        return super().default(o)
+def json_bytes(o):
+    # `default` hook of json.dump, so that json is only imported when dumping
+    if isinstance(o, bytes):
+        return o.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def open_cache(args: dict):
+    if not args.get("cache"):
+        return None
+    from localecache import ArtifactCache
+
+    return ArtifactCache(args["cache"])
+
+
+def is_relative_to(path, root: str) -> bool:
+    path = os.path.abspath(str(path))
+    return os.path.commonpath([path, root]) == root
+
+
+def nib_stem(path: str) -> str:
+    parent, name = os.path.split(str(path))
+    # keyedobjects*.nib inside a .nib directory
+    if parent.endswith(".nib") and os.path.basename(parent) != ".nib":
+        return os.path.splitext(os.path.basename(parent))[0]
+    return os.path.splitext(name)[0]
+
+
+def titles_cache_name(path: str) -> str:
+    from localecache import name_digest
+
+    return f"titles/{nib_stem(path)}-{name_digest(path)}.json"
+
+
+def resolve_nib(path) -> str:
+    """The archive file of a NIB, which may be a directory holding keyedobjects*.nib."""
+    path = str(path)
+    if not os.path.isdir(path):
+        return path if os.path.exists(path) else None
+    candidates = sorted(f for f in os.listdir(path) if f.startswith("keyedobjects"))
+    if "keyedobjects.nib" in candidates:
+        return os.path.join(path, "keyedobjects.nib")
+    return os.path.join(path, candidates[-1]) if candidates else None
+
+
+def load_archive(src_path, parser: nibarchive.NIBArchiveParser = None) -> nibarchive.NIBArchive:
+    """Parse a NIB of either flavor; `parser` is used for NIBArchive files."""
+    with open(str(src_path), "rb") as fp:
+        if parser is not None and fp.read(10) == b"NIBArchive":
+            return parser.parse(fp)
+        return nibarchive.parse_archive(fp)
+
+
+def dump_values(archive: nibarchive.NIBArchive, out_path) -> None:
+    import dataclasses
+    import json
+
+    # Using dataclasses we can simply convert our NIBArchive into a dict
+    with open(str(out_path), "w", encoding="utf-8") as ofp:
+        json.dump(dataclasses.asdict(archive)['values'], ofp, indent=2, default=json_bytes, ensure_ascii=False)
+
+
+def write_json(src_path, out_path, parser: nibarchive.NIBArchiveParser = None) -> None:
+    dump_values(load_archive(src_path, parser), out_path)
+
+
+def load_titles(src_path, parser: nibarchive.NIBArchiveParser = None) -> dict:
+    return nibarchive.extract_titles(load_archive(src_path, parser))
+
+
+def write_titles(src_path, out_path, parser: nibarchive.NIBArchiveParser = None) -> None:
+    import json
+
+    with open(str(out_path), "w", encoding="utf-8") as ofp:
+        json.dump(load_titles(src_path, parser), ofp, ensure_ascii=False)
+
+
+def alignment_cache_name(base_path: str, target_path: str) -> str:
+    from localecache import name_digest
+
+    return f"aligned/{nib_stem(target_path)}-{name_digest(base_path, target_path)}.json"
+
+
+def write_alignment(base_path, target_path, out_path) -> None:
+    import json
+
+    aligned = nibarchive.align_strings(load_archive(base_path), load_archive(target_path))
+    with open(str(out_path), "w", encoding="utf-8") as ofp:
+        json.dump(aligned, ofp, ensure_ascii=False)
+
+
+def default_output(output, suffix: str) -> str:
+    output = output or "."
+    if os.path.isdir(output):
+        import datetime
 
+        output = os.path.join(output, f"nibarchive-{datetime.datetime.now()}{suffix}")
+    return output
 
-def write_swift(src_name: str, out_path: str, archive: NIBArchive, print_empty) -> None:
-    print(f"> Converting {src_name}.nib... ", end="")
+
+def write_swift(src_name: str, out_path: str, archive: nibarchive.NIBArchive, print_empty, quiet=False) -> None:
+    if not quiet:
+        print(f"> Converting {src_name}.nib... ", end="")
     with open(str(out_path), "w", encoding="utf-8") as ofp:
         writer = FileWriter(ofp)
         printer = NIBObjectPrinter(archive, writer, print_empty=print_empty)
@@ -150,91 +245,258 @@ def write_swift(src_name: str, out_path: str, archive: NIBArchive, print_empty)
         for obj in archive.objects:
             printer.print_object(obj)
         ofp.write("}\n")
-    print("Ok")
+    if not quiet:
+        print("Ok")
+
+
+def nib_files(files, recurse: bool):
+    """(stem, path) of the NIB files given, expanding directories."""
+    import pathlib
+
+    for file_path in map(pathlib.Path, files):
+        if not file_path.is_dir():
+            yield file_path.stem, file_path
+        else:
+            for nib_file in (
+                file_path.glob("*.nib")
+                if not recurse
+                else file_path.rglob("*.nib")
+            ):
+                if nib_file.is_dir():
+                    continue
+                yield nib_file.stem, nib_file
 
 
 def dump_swift(args: dict):
     files = args["path"]
-    parser = NIBArchiveParser(verify=True)
+    parser = nibarchive.NIBArchiveParser(verify=True)
 
     if len(files) == 1 and not os.path.isdir(files[0]):
-        output = pathlib.Path(args.get("output") or ".")
-        if output.is_dir():
-            output = output / f"nibarchive-{datetime.datetime.now()}.swift"
+        output = default_output(args.get("output"), ".swift")
 
         with open(files[0], "rb") as fp:
             archive = parser.parse(fp)
-        write_swift(pathlib.Path(files[0]).stem, output, archive, args["print_empty"])
+        write_swift(os.path.splitext(os.path.basename(files[0]))[0], output, archive, args["print_empty"])
     else:
-        for file_path in map(pathlib.Path, files):
-            if not file_path.is_dir():
-                output = file_path.parent / f"{file_path.stem}.swift"
-                with open(str(file_path), "rb") as fp:
-                    archive = parser.parse(fp)
-                write_swift(file_path.stem, output, archive, args["print_empty"])
-            else:
-                for nib_file in (
-                    file_path.glob("*.nib")
-                    if not args["recurse"]
-                    else file_path.rglob("*.nib")
-                ):
-                    if nib_file.is_dir():
-                        continue
-
-                    output = nib_file.parent / f"{nib_file.stem}.swift"
-                    with open(str(nib_file), "rb") as fp:
-                        archive = parser.parse(fp)
-                    write_swift(nib_file.stem, output, archive, args["print_empty"])
+        for stem, file_path in nib_files(files, args["recurse"]):
+            output = file_path.parent / f"{stem}.swift"
+            with open(str(file_path), "rb") as fp:
+                archive = parser.parse(fp)
+            write_swift(stem, output, archive, args["print_empty"])
 
 
 def dump_json(args: dict):
     files = args["path"]
-    parser = NIBArchiveParser(verify=True)
 
     if len(files) == 1 and not os.path.isdir(files[0]):
-        output = pathlib.Path(args.get("output") or ".")
-        if output.is_dir():
-            output = output / f"nibarchive-{datetime.datetime.now()}.swift"
+        output = default_output(args.get("output"), ".swift")
 
-        with open(files[0], "rb") as fp:
-            archive = parser.parse(fp)
-        with open(str(output), "w", encoding="utf-8") as ofp:
-            json.dump(dataclasses.asdict(archive)['values'], ofp, indent=2, cls=JSONBytesEncoder, ensure_ascii=False)
+        def build(out_path):
+            write_json(files[0], out_path, nibarchive.NIBArchiveParser(verify=True))
+
+        cache = open_cache(args)
+        if cache is not None and is_relative_to(output, cache.root):
+            # Managed dump: rebuilt only when the NIB (or its app) changed
+            if cache.fetch(os.path.relpath(output, cache.root), [files[0]], build) is None:
+                raise SystemExit(1)
+        else:
+            build(output)
 
     else:
-        for file_path in map(pathlib.Path, files):
-            if not file_path.is_dir():
-                with open(str(file_path), "rb") as fp:
-                    archive = parser.parse(fp)
-                output = str(file_path.parent / f"{file_path.stem}.swift")
-                with open(output, "w", encoding="utf-8") as ofp:
-                    json.dump(
-                        dataclasses.asdict(archive)['values'], ofp, indent=2, cls=JSONBytesEncoder, ensure_ascii=False
-                    )
-            else:
-                for nib_file in (
-                    file_path.glob("*.nib")
-                    if not args["recurse"]
-                    else file_path.rglob("*.nib")
-                ):
-                    if nib_file.is_dir():
-                        continue
-
-                    output = nib_file.parent / f"{nib_file.stem}.swift"
-                    with open(str(nib_file), "rb") as fp:
-                        archive = parser.parse(fp)
-                    # Using dataclasses we can simply convert our NIBArchive into a dict
-                    with open(output, "w", encoding="utf-8") as ofp:
-                        json.dump(
-                            dataclasses.asdict(archive)['values'],
-                            ofp,
-                            indent=2,
-                            cls=JSONBytesEncoder,
-                            ensure_ascii=False,
-                        )
+        parser = nibarchive.NIBArchiveParser(verify=True)
+        for stem, file_path in nib_files(files, args["recurse"]):
+            with open(str(file_path), "rb") as fp:
+                archive = parser.parse(fp)
+            dump_values(archive, file_path.parent / f"{stem}.swift")
+
+
+def dump_titles(args: dict):
+    import json
+
+    path = args["path"]
+
+    cache = open_cache(args)
+    if cache is None:
+        titles = load_titles(path)
+    else:
+        def build(out_path):
+            write_titles(path, out_path)
+
+        cached = cache.fetch(titles_cache_name(path), [path], build)
+        with open(cached, "r", encoding="utf-8") as fp:
+            titles = json.load(fp)
+
+    # Resolve a title to its keys with one probe of the normalized index,
+    # so that "Save As..." also finds "Save As…" or "Save &As…"
+    if args.get("string") is not None:
+        from localeindex import NormalizedIndex
+
+        index = NormalizedIndex((title, key) for key, title in titles.items())
+        matches = index.lookup(args["string"])
+        titles = {key: title for title, key in matches}
+
+    output = args.get("output")
+    if output is None or output == "/dev/stdout":
+        print(json.dumps(titles, ensure_ascii=False))
+    else:
+        with open(output, "w", encoding="utf-8") as ofp:
+            json.dump(titles, ofp, ensure_ascii=False)
+
+
+def scan_nibs(directory: str) -> dict:
+    """NIBs below `directory`, mapped to their archive file, its mtime and size."""
+    found = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        entries = [name for name in filenames if name.endswith(".nib")]
+        # keyedobjects*.nib inside .nib directories belong to the directory
+        entries += [name for name in dirnames if name.endswith(".nib")]
+        dirnames[:] = [name for name in dirnames if not name.endswith(".nib")]
+        for name in entries:
+            entry = os.path.join(dirpath, name)
+            archive = resolve_nib(entry)
+            try:
+                st = os.stat(archive)
+            except (OSError, TypeError):
+                continue
+            found[entry] = (archive, st.st_mtime_ns, st.st_size)
+    return found
+
+
+def watch_output(entry: str, archive: str, fmt: str) -> str:
+    return os.path.join(os.path.dirname(entry), f"{nib_stem(archive)}.{fmt}")
+
+
+def update_nib(entry: str, archive: str, args: dict, cache, changed: bool = True) -> None:
+    if cache is not None:
+        name = titles_cache_name(archive)
+        # The cache trusts unchanged bundles, but this NIB is known to have changed
+        if changed or not cache.is_fresh(name):
+            print(f"> Updating {cache.path(name)}... ", end="", flush=True)
+            cache.fetch(name, [archive], lambda tmp: write_titles(archive, tmp), force=changed)
+            print("Ok")
+        if changed:
+            # alignments against or of this NIB, as read by locale_search.py
+            for name in cache.dependents(archive, "aligned/"):
+                base_path, target_path = (s["path"] for s in cache.entry(name)["sources"])
+                print(f"> Updating {cache.path(name)}... ", end="", flush=True)
+                cache.fetch(
+                    name, [base_path, target_path],
+                    lambda tmp: write_alignment(base_path, target_path, tmp), force=True,
+                )
+                print("Ok")
+        return
+    output = watch_output(entry, archive, args["format"])
+    tmp = os.path.join(os.path.dirname(output), f".{os.path.basename(output)}.{os.getpid()}.tmp")
+    print(f"> Updating {output}... ", end="", flush=True)
+    try:
+        if args["format"] == "swift":
+            write_swift(nib_stem(archive), tmp, load_archive(archive), False, quiet=True)
+        else:
+            write_json(archive, tmp)
+        os.replace(tmp, output)
+        print("Ok")
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def remove_nib(entry: str, archive: str, args: dict, cache) -> None:
+    if cache is not None:
+        cache.invalidate(titles_cache_name(archive))
+        for name in cache.dependents(archive, "aligned/"):
+            cache.invalidate(name)
+        return
+    output = watch_output(entry, archive, args["format"])
+    if os.path.exists(output):
+        print(f"> Removing {output}... ", end="")
+        os.remove(output)
+        print("Ok")
+
+
+def sync_nibs(known: dict, current: dict, args: dict, cache, initial: bool = False) -> None:
+    """Bring the outputs of the NIBs in `known` up to date with `current`."""
+    for entry in sorted(set(known) - set(current)):
+        remove_nib(entry, known[entry][0], args, cache)
+    for entry, stamp in sorted(current.items()):
+        archive = stamp[0]
+        if not initial and known.get(entry) == stamp:
+            continue
+        if initial and cache is None:
+            # outputs of an earlier run are reused unless the NIB is newer
+            try:
+                if os.stat(watch_output(entry, archive, args["format"])).st_mtime_ns >= stamp[1]:
+                    continue
+            except OSError:
+                pass
+        try:
+            update_nib(entry, archive, args, cache, changed=not initial)
+        except Exception as e:
+            # e.g. a NIB still being written; retried when it changes again
+            print(f"Failed ({e})")
+
+
+def watch(args: dict):
+    import contextlib
+    import time
+    from fswatch import open_watcher
+
+    roots = [os.path.abspath(root) for root in args["path"]]
+    cache = open_cache(args)
+
+    def batch():
+        return cache.batch() if cache is not None else contextlib.nullcontext()
+
+    def scan(dirs):
+        found = {}
+        for directory in dirs:
+            found.update(scan_nibs(directory))
+        return found
+
+    known = scan(roots)
+    with batch():
+        sync_nibs({}, known, args, cache, initial=True)
+    if args["once"]:
+        return
+
+    try:
+        with open_watcher(
+            roots, args["poll"], args["interval"], files=lambda name: name.endswith(".nib"),
+            kqueue=args["kqueue"],
+        ) as watcher:
+            while True:
+                changed = watcher.wait_quiet(args["debounce"])
+                if changed is None:
+                    dirs = roots
+                else:
+                    dirs = set()
+                    for directory in changed:
+                        # a change inside a .nib directory is a change of the NIB
+                        while os.path.basename(directory).endswith(".nib"):
+                            directory = os.path.dirname(directory)
+                        dirs.add(directory)
+                    dirs = [d for d in dirs if not any(d != o and is_relative_to(d, o) for o in dirs)]
+
+                old = {e: s for e, s in known.items() if any(is_relative_to(e, d) for d in dirs)}
+                current = scan(dirs)
+                if changed is None:
+                    # Without events, an install is over once two scans agree
+                    while current != old:
+                        time.sleep(args["debounce"])
+                        previous, current = current, scan(dirs)
+                        if current == previous:
+                            break
+                with batch():
+                    sync_nibs(old, current, args, cache)
+                for entry in old:
+                    del known[entry]
+                known.update(current)
+    except KeyboardInterrupt:
+        raise SystemExit(130)
 
 
 def main(cmd=None):
+    import argparse
+
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers()
 
@@ -274,8 +536,53 @@ def main(cmd=None):
         action="store_true",
         help="Converts all NIB files recursively.",
     )
+    p_dump_json.add_argument(
+        "-c",
+        "--cache",
+        help="Root of the locale cache; outputs below it are rebuilt only when stale.",
+    )
     p_dump_json.set_defaults(fn=dump_json)
 
+    p_dump_titles = subparsers.add_parser(
+        "dump-titles", help="NIB => JSON of localized titles"
+    )
+    p_dump_titles.add_argument("path", help="Path of the NIB file.")
+    p_dump_titles.add_argument(
+        "-s", "--string", help="Only dump titles matching this string (normalized)."
+    )
+    p_dump_titles.add_argument("-o", "--output", help="Output path")
+    p_dump_titles.add_argument("-c", "--cache", help="Root of the locale cache.")
+    p_dump_titles.set_defaults(fn=dump_titles)
+
+    p_watch = subparsers.add_parser(
+        "watch", help="Keep the outputs of NIB files up to date as they change"
+    )
+    p_watch.add_argument("path", help="Directories to watch.", nargs="+")
+    p_watch.add_argument(
+        "-f",
+        "--format",
+        choices=["json", "swift"],
+        default="json",
+        help="Output written next to each NIB file.",
+    )
+    p_watch.add_argument(
+        "-c",
+        "--cache",
+        help="Root of the locale cache; refreshes cached titles instead of writing outputs.",
+    )
+    p_watch.add_argument(
+        "--debounce", type=float, default=2.0, help="Seconds without changes before converting."
+    )
+    p_watch.add_argument(
+        "-i", "--interval", type=float, default=5.0, help="Seconds between scans when polling."
+    )
+    p_watch.add_argument("--poll", action="store_true", help="Poll even if inotify (or kqueue) is available.")
+    p_watch.add_argument(
+        "--kqueue", action="store_true", help="Watch with kqueue where available instead of polling (macOS)."
+    )
+    p_watch.add_argument("--once", action="store_true", help="Update outputs once and exit.")
+    p_watch.set_defaults(fn=watch)
+
     args = parser.parse_args(cmd)
     func = args.fn
     if func is not None:
@@ -1,3 +1,45 @@
+# Submodules are only imported when one of their names is first accessed, so
+# that scripts importing the package do not pay for the dataclass and enum
+# construction of the model (or for plistlib) unless they actually parse a NIB.
+import importlib
 
-from .model import *
-from .parse import *
\ No newline at end of file
+_SUBMODULES = ("model", "symbols", "parse", "strings", "keyed")
+_EXPORTS = {
+    "NIBArchiveHeader": "model",
+    "ClassName": "model",
+    "NIBKey": "model",
+    "NIBValueType": "model",
+    "NIBValue": "model",
+    "NIBObject": "model",
+    "NIBArchive": "model",
+    "SymbolTable": "symbols",
+    "default_symbol_table": "symbols",
+    "NIBFormatError": "parse",
+    "is_nib": "parse",
+    "varint": "parse",
+    "NIBArchiveParser": "parse",
+    "MAGIC_BYTES": "parse",
+    "iter_strings": "strings",
+    "extract_titles": "strings",
+    "align_strings": "strings",
+    "KeyedArchive": "keyed",
+    "NSKeyedArchiveParser": "keyed",
+    "is_keyed_archive": "keyed",
+    "parse_archive": "keyed",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module("." + _EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_SUBMODULES))
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import io
+
+from dataclasses import dataclass
+from typing import Any
+
+from nibarchive import (
+    NIBArchive,
+    NIBArchiveHeader,
+    NIBObject,
+    NIBValue,
+    NIBValueType,
+    NIBArchiveParser,
+    NIBFormatError,
+    MAGIC_BYTES,
+)
+from nibarchive.symbols import SymbolTable, default_symbol_table
+
+__all__ = [
+    "KeyedArchive",
+    "NSKeyedArchiveParser",
+    "is_keyed_archive",
+    "parse_archive",
+]
+
+NULL_CLASS_NAME = "$null"
+CLASS_CLASS_NAME = "$class"
+STRING_CLASS_NAME = "NSString"
+DATA_CLASS_NAME = "NSData"
+NUMBER_CLASS_NAME = "NSNumber"
+
+
+@dataclass
+class KeyedArchive(NIBArchive):
+    """A NIB stored as NSKeyedArchiver plist, decoded into the NIBArchive model.
+
+    Every entry of ``$objects`` becomes the :class:`NIBObject` with the same
+    index, so ``CF$UID`` references turn into ``OBJECT_REF`` values whose data
+    is the index of the referenced object. Strings become ``NSString`` objects
+    holding their UTF-8 bytes under ``NS.bytes``, as in NIB archives; raw data
+    becomes ``NSData`` objects holding it under ``NS.data``.
+    """
+
+    # keyed archives store the localization key of a title before the title
+    title_key_first = True
+    # values under these keys are raw data, not strings
+    binary_keys = ("NS.data",)
+
+
+def is_keyed_archive(fp) -> bool:
+    """
+    Check if the given file or byte array starts like a (binary or XML) plist.
+
+    :param fp: File or byte array to check.
+    :type fp: Union[io.IOBase, bytes, bytearray]
+    :return: True if the input looks like a plist, False otherwise.
+    :rtype: bool
+    """
+    if isinstance(fp, io.IOBase):
+        fp.seek(0)
+        data = fp.read(8)
+        fp.seek(0)
+    else:
+        data = bytes(fp[:8])
+    return data.startswith(b"bplist") or data.startswith(b"<?xml")
+
+
+def _uid(value: Any, uid_type: type) -> int | None:
+    if isinstance(value, uid_type):
+        return value.data
+    # XML plists keep UIDs as {"CF$UID": n}
+    if isinstance(value, dict) and len(value) == 1 and "CF$UID" in value:
+        return value["CF$UID"]
+    return None
+
+
+class NSKeyedArchiveParser:
+    """A parser for NIBs stored as NSKeyedArchiver plists.
+
+    :param verify: Flag indicating whether to check references while parsing (default: True).
+    :type verify: bool
+    :param symbols: Table interning key and class names (default: the process-wide table).
+    :type symbols: SymbolTable
+    """
+
+    def __init__(self, verify: bool = True, symbols: SymbolTable = None) -> None:
+        self.archive: KeyedArchive = None
+        self.verify = verify
+        self.symbols = symbols if symbols is not None else default_symbol_table()
+        self._keys: dict[str, int] = {}
+        self._class_names: dict[int, int] = {}
+        self._uid_type: type = None
+
+    def parse(self, fp: io.IOBase) -> KeyedArchive:
+        """Parses the keyed archive.
+
+        :param fp: File object containing the plist.
+        :type fp: io.IOBase
+        :return: The decoded archive.
+        :rtype: KeyedArchive
+        :raises NIBFormatError: If the plist is not a keyed archive.
+        """
+        import plistlib
+
+        try:
+            plist = plistlib.load(fp)
+        except Exception as e:
+            raise NIBFormatError(f"Invalid property list: {e}") from e
+        self._uid_type = plistlib.UID
+        if not isinstance(plist, dict) or not isinstance(plist.get("$objects"), list):
+            raise NIBFormatError("Expected a keyed archive with '$objects'")
+
+        objects = plist["$objects"]
+        self.archive = KeyedArchive(NIBArchiveHeader(0, 0, 0, 0, 0, 0, 0, 0, 0, 0))
+        self._keys = {}
+        self._class_names = {}
+        for index, obj in enumerate(objects):
+            self._parse_object(index, obj, objects)
+
+        header = self.archive.header
+        header.object_count = len(self.archive.objects)
+        header.key_count = len(self.archive.keys)
+        header.value_count = len(self.archive.values)
+        header.class_name_count = len(self.archive.class_names)
+        return self.archive
+
+    def _key_index(self, name: str) -> int:
+        if name not in self._keys:
+            self._keys[name] = len(self.archive.keys)
+            self.archive.keys.append(self.symbols.key(name.encode("utf-8")))
+        return self._keys[name]
+
+    def _class_name_index(self, name: str, key: int | None = None) -> int:
+        # class dicts are shared by reference, so they are looked up by UID
+        lookup = key if key is not None else name
+        if lookup not in self._class_names:
+            self._class_names[lookup] = len(self.archive.class_names)
+            self.archive.class_names.append(self.symbols.class_name(name.encode("utf-8") + b"\0"))
+        return self._class_names[lookup]
+
+    def _add_object(self, class_name_index: int, values: list[NIBValue]) -> None:
+        self.archive.objects.append(
+            NIBObject(class_name_index, len(self.archive.values), len(values))
+        )
+        self.archive.values.extend(values)
+
+    def _class_of(self, uid: int, objects: list) -> int:
+        if self.verify and not 0 <= uid < len(objects):
+            raise NIBFormatError(f"Class reference out of range: {uid}")
+        class_dict = objects[uid] if 0 <= uid < len(objects) else {}
+        name = class_dict.get("$classname", "") if isinstance(class_dict, dict) else ""
+        return self._class_name_index(name, uid)
+
+    def _parse_object(self, index: int, obj: Any, objects: list) -> None:
+        if index == 0 and obj == NULL_CLASS_NAME:
+            self._add_object(self._class_name_index(NULL_CLASS_NAME), [])
+        elif isinstance(obj, str):
+            self._add_object(
+                self._class_name_index(STRING_CLASS_NAME),
+                [NIBValue(self._key_index("NS.bytes"), NIBValueType.DATA, obj.encode("utf-8"))],
+            )
+        elif isinstance(obj, (bytes, bytearray)):
+            self._add_object(
+                self._class_name_index(DATA_CLASS_NAME),
+                [NIBValue(self._key_index("NS.data"), NIBValueType.DATA, bytes(obj))],
+            )
+        elif isinstance(obj, dict) and "$classname" in obj:
+            self._add_object(self._class_name_index(obj["$classname"], index), [])
+        elif isinstance(obj, dict):
+            uid = _uid(obj.get("$class"), self._uid_type)
+            class_name_index = (
+                self._class_of(uid, objects) if uid is not None
+                else self._class_name_index(CLASS_CLASS_NAME)
+            )
+            values = []
+            for key, value in obj.items():
+                if key != "$class":
+                    values.extend(self._parse_values(key, value, objects))
+            self._add_object(class_name_index, values)
+        else:
+            self._add_object(
+                self._class_name_index(NUMBER_CLASS_NAME),
+                self._parse_values("NS.value", obj, objects),
+            )
+
+    def _parse_values(self, key: str, value: Any, objects: list) -> list[NIBValue]:
+        key_index = self._key_index(key)
+        uid = _uid(value, self._uid_type)
+        if uid is not None:
+            if self.verify and not 0 <= uid < len(objects):
+                raise NIBFormatError(f"Object reference out of range: {uid}")
+            return [NIBValue(key_index, NIBValueType.OBJECT_REF, uid)]
+        if isinstance(value, list):
+            # arrays of references, one value per element like in NIB archives
+            values = []
+            for item in value:
+                values.extend(self._parse_values(key, item, objects))
+            return values
+        if isinstance(value, bool):
+            value_type = NIBValueType.BOOL_TRUE if value else NIBValueType.BOOL_FALSE
+            return [NIBValue(key_index, value_type, value)]
+        if isinstance(value, int):
+            for value_type, bits in (
+                (NIBValueType.INT8, 8), (NIBValueType.INT16, 16), (NIBValueType.INT32, 32)
+            ):
+                if -(1 << (bits - 1)) <= value < (1 << (bits - 1)):
+                    return [NIBValue(key_index, value_type, value)]
+            return [NIBValue(key_index, NIBValueType.INT64, value)]
+        if isinstance(value, float):
+            return [NIBValue(key_index, NIBValueType.DOUBLE, value)]
+        if isinstance(value, str):
+            return [NIBValue(key_index, NIBValueType.DATA, value.encode("utf-8"))]
+        if isinstance(value, (bytes, bytearray)):
+            return [NIBValue(key_index, NIBValueType.DATA, bytes(value))]
+        if value is None:
+            return [NIBValue(key_index, NIBValueType.NIL)]
+        return [NIBValue(key_index, NIBValueType.DATA, str(value).encode("utf-8"))]
+
+
+def parse_archive(fp: io.IOBase, verify: bool = True, symbols: SymbolTable = None) -> NIBArchive:
+    """Parse a NIB of either flavor: NIBArchive or NSKeyedArchiver plist.
+
+    :param fp: File object containing the NIB.
+    :type fp: io.IOBase
+    :param verify: Flag indicating whether to perform verification checks.
+    :type verify: bool
+    :param symbols: Table interning key and class names (default: the process-wide table).
+    :type symbols: SymbolTable
+    :return: The parsed archive.
+    :rtype: NIBArchive
+    :raises NIBFormatError: If the file is neither of both flavors.
+    """
+    fp.seek(0)
+    magic = fp.read(len(MAGIC_BYTES))
+    fp.seek(0)
+    if magic == MAGIC_BYTES:
+        return NIBArchiveParser(verify=verify, symbols=symbols).parse(fp)
+    if is_keyed_archive(magic):
+        return NSKeyedArchiveParser(verify=verify, symbols=symbols).parse(fp)
+    raise NIBFormatError("Expected b'NIBArchive' magic or a property list")
@@ -84,11 +84,26 @@ class ClassName:
     :type name: str
     :param extras: Extra integers associated with the class (default: empty list).
     :type extras: list[int]
+    :param symbol: Symbol of the name in a :class:`SymbolTable` (default: None).
+                   Class names that both have one compare names by symbol.
+    :type symbol: int | None
     """
     length: int  # varint
     extras_count: int  # varint
     name: str  # name definition comes after extra integers
     extras: list[int] = field(default_factory=list)
+    symbol: int | None = field(default=None, compare=False)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ClassName):
+            return NotImplemented
+        if self is other:
+            return True
+        if self.symbol is not None and other.symbol is not None:
+            same_name = self.symbol == other.symbol
+        else:
+            same_name = self.name == other.name
+        return same_name and self.extras == other.extras
 
 
 @dataclass
@@ -101,11 +116,23 @@ class NIBKey:
     :type length: int
     :param name: Name of the key.
     :type name: str
+    :param symbol: Symbol of the name in a :class:`SymbolTable` (default: None).
+                   Keys that both have one compare by symbol.
+    :type symbol: int | None
     """
     length: int  # varint
     name: str
+    symbol: int | None = field(default=None, compare=False)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, NIBKey):
+            return NotImplemented
+        if self.symbol is not None and other.symbol is not None:
+            return self.symbol == other.symbol
+        return self.name == other.name
 
     def __hash__(self) -> int:
+        # equal symbols imply equal names
         return hash(self.name)
 
 
@@ -24,11 +24,10 @@ from nibarchive import (
     NIBArchive,
     NIBArchiveHeader,
     NIBObject,
-    NIBKey,
     NIBValue,
     NIBValueType,
-    ClassName
 )
+from nibarchive.symbols import SymbolTable, default_symbol_table
 
 MAGIC_BYTES = b"NIBArchive"
 """Magic bytes at the start of all NIB archives."""
@@ -114,17 +113,23 @@ class NIBArchiveParser:
 
     :param verify: Flag indicating whether to perform verification checks during parsing (default: True).
     :type verify: bool
+    :param symbols: Table interning key and class names (default: the process-wide table).
+    :type symbols: SymbolTable
     """
 
-    def __init__(self, verify: bool = True) -> None:
+    def __init__(self, verify: bool = True, symbols: SymbolTable = None) -> None:
         """
         Initialize the NIBArchiveParser.
 
         :param verify: Flag indicating whether to perform verification checks during parsing.
         :type verify: bool
+        :param symbols: Table interning key and class names; keys and class names
+                        of archives parsed with the same table are shared objects.
+        :type symbols: SymbolTable
         """
         self.archive: NIBArchive = None
         self.verify = verify
+        self.symbols = symbols if symbols is not None else default_symbol_table()
 
     def parse(self, fp: io.IOBase) -> NIBArchive:
         """Parses the NIB archive.
@@ -188,7 +193,7 @@ class NIBArchiveParser:
         for _ in range(self.archive.header.key_count):
             length, cnt = varint(fp)
             offset += cnt + length
-            key = NIBKey(length, fp.read(length).decode("utf-8"))
+            key = self.symbols.key(fp.read(length))
             self.archive.keys.append(key)
         return offset
 
@@ -201,11 +206,7 @@ class NIBArchiveParser:
 
             extras = struct.unpack(
                 "<%s" % "i"*extras_count, fp.read(4*extras_count))
-            # Name is \0 terminated, so we have to remove the trailing \0
-            name = fp.read(length)
-            class_name = ClassName(
-                length, extras_count, extras=list(extras), name=name[:-1].decode("utf-8")
-            )
+            class_name = self.symbols.class_name(fp.read(length), extras)
             self.archive.class_names.append(class_name)
         return offset
 
@@ -265,7 +266,7 @@ class NIBArchiveParser:
         value.data = fp.read(length)
 
         if length > 10 and is_nib(io.BytesIO(value.data)):
-            parser = NIBArchiveParser(verify=self.verify)
+            parser = NIBArchiveParser(verify=self.verify, symbols=self.symbols)
             value.data = parser.parse(io.BytesIO(value.data))
             value.type = NIBValueType.NIBARCHIVE
 
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+from nibarchive import NIBArchive, NIBValueType
+
+__all__ = [
+    "iter_strings",
+    "extract_titles",
+    "align_strings",
+]
+
+
+def _decode(data: bytes) -> str | None:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def iter_strings(archive: NIBArchive) -> Iterator[str]:
+    """Iterate over all string values of an archive in storage order.
+
+    Nested archives are expanded in place, so the order matches the order in
+    which strings appear in a JSON dump of the archive's values.
+
+    :param archive: The parsed archive.
+    :type archive: NIBArchive
+    :return: An iterator over the decoded strings.
+    :rtype: Iterator[str]
+    """
+    binary_keys = getattr(archive, "binary_keys", ())
+    skipped = {i for i, key in enumerate(archive.keys) if key.name in binary_keys}
+    for value in archive.values:
+        if value.type == NIBValueType.NIBARCHIVE:
+            yield from iter_strings(value.data)
+        elif (
+            value.type == NIBValueType.DATA
+            and isinstance(value.data, bytes)
+            and value.key_index not in skipped
+        ):
+            string = _decode(value.data)
+            if string is not None:
+                yield string
+
+
+def extract_titles(archive: NIBArchive) -> dict[str, str]:
+    """Collect "*.title" keys together with the strings they localize.
+
+    Localized NIB archives store the localization key of a title right after
+    the title itself, e.g. ``"Save As…"`` followed by ``"a3D-4e.title"``;
+    keyed archives store the key right before the title.
+
+    :param archive: The parsed archive.
+    :type archive: NIBArchive
+    :return: A dictionary mapping title keys to titles.
+    :rtype: dict[str, str]
+    """
+    titles = {}
+    prev = None
+    key_first = getattr(archive, "title_key_first", False)
+    for string in iter_strings(archive):
+        if prev is not None:
+            if key_first and prev.endswith(".title") and not string.endswith(".title"):
+                titles[prev] = string
+            elif not key_first and string.endswith(".title"):
+                titles[string] = prev
+        prev = string
+    return titles
+
+
+# Segments between anchors larger than this (in pairs of strings compared) are
+# diffed with difflib's junk heuristic, which keeps them from taking quadratic time
+MAX_EXACT_DIFF = 1_000_000
+
+
+def _anchors(base: list[str], target: list[str]) -> list[tuple[int, int]]:
+    """Positions of strings occurring exactly once in both lists, in common order.
+
+    These are mostly "*.title" keys and other identifiers that localization
+    leaves untouched; the longest run of them that is in the same order in both
+    lists is kept, as in patience diff.
+    """
+    import bisect
+    from collections import Counter
+
+    base_counts, target_counts = Counter(base), Counter(target)
+    target_index = {s: j for j, s in enumerate(target) if target_counts[s] == 1}
+    pairs = [
+        (i, target_index[s])
+        for i, s in enumerate(base)
+        if base_counts[s] == 1 and s in target_index
+    ]
+    # longest increasing subsequence of the target positions
+    tails, tail_pairs, previous = [], [], []
+    for n, (_, j) in enumerate(pairs):
+        k = bisect.bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_pairs.append(n)
+        else:
+            tails[k] = j
+            tail_pairs[k] = n
+        previous.append(tail_pairs[k - 1] if k else None)
+    anchors = []
+    n = tail_pairs[-1] if tail_pairs else None
+    while n is not None:
+        anchors.append(pairs[n])
+        n = previous[n]
+    return anchors[::-1]
+
+
+def _pair_segment(base: list[str], target: list[str], pairs: list, key_first: bool) -> None:
+    if len(base) == len(target):
+        pairs.extend(zip(base, target))
+        return
+    import difflib
+
+    matcher = difflib.SequenceMatcher(
+        None, base, target, autojunk=len(base) * len(target) > MAX_EXACT_DIFF
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "replace":
+            continue
+        # a title is stored next to its key, which is an anchor, so runs of
+        # different lengths are paired up starting from the side of the key
+        if key_first:
+            pairs.extend(zip(base[i1:i2], target[j1:j2]))
+        else:
+            n = min(i2 - i1, j2 - j1)
+            pairs.extend(zip(base[i2 - n:i2], target[j2 - n:j2]))
+
+
+def align_strings(base: NIBArchive, target: NIBArchive) -> dict[str, str]:
+    """Map the strings of a base-locale archive to those of a localized one.
+
+    Localized NIBs are compiled from the same document, so their strings line up
+    with the base ones; strings that are the same in both archives are left out.
+    If the archives differ structurally, they are split at strings unique to and
+    identical in both (such as "*.title" keys), and only the segments in between
+    are aligned with a diff, pairing up changed runs.
+
+    :param base: The archive of the base (English) locale.
+    :type base: NIBArchive
+    :param target: The archive of the localized locale.
+    :type target: NIBArchive
+    :return: A dictionary mapping base strings to localized strings.
+    :rtype: dict[str, str]
+    """
+    base_strings = list(iter_strings(base))
+    target_strings = list(iter_strings(target))
+    pairs = []
+    if len(base_strings) == len(target_strings):
+        pairs = zip(base_strings, target_strings)
+    else:
+        key_first = getattr(base, "title_key_first", False)
+        i = j = 0
+        for anchor_i, anchor_j in _anchors(base_strings, target_strings) + [
+            (len(base_strings), len(target_strings))
+        ]:
+            _pair_segment(base_strings[i:anchor_i], target_strings[j:anchor_j], pairs, key_first)
+            i, j = anchor_i + 1, anchor_j + 1
+
+    aligned = {}
+    for base_string, target_string in pairs:
+        if base_string != target_string and base_string not in aligned:
+            aligned[base_string] = target_string
+    return aligned
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import sys
+import threading
+
+from nibarchive import ClassName, NIBKey
+
+__all__ = [
+    "SymbolTable",
+    "default_symbol_table",
+]
+
+
+# Symbols are assigned process-wide, so that keys and class names compare by
+# symbol whichever table interned them
+_symbols: dict[str, int] = {}
+_names: list[str] = []
+# Only taken on misses, which stop happening after the first few archives
+_lock = threading.Lock()
+
+
+class SymbolTable:
+    """Interns the key and class names of NIB archives.
+
+    Archives of the same app (and of different apps) share almost all of their
+    key and class names, so instead of decoding them into fresh objects for
+    every archive, parsers look up the raw bytes here and get back one shared
+    :class:`NIBKey` or :class:`ClassName` per distinct name. Every distinct name
+    also gets an integer symbol (stored in the ``symbol`` attribute of the
+    shared objects) that identifies it across all archives of the process, so
+    that keys and class names compare as integers.
+
+    Shared objects must be treated as read-only, as they may be referenced by
+    any number of archives.
+    """
+
+    def __init__(self) -> None:
+        self._keys: dict[bytes, NIBKey] = {}
+        self._class_names: dict[tuple[bytes, tuple[int, ...]], ClassName] = {}
+        self._seen: set[int] = set()
+
+    def symbol(self, name: str) -> int:
+        """Get the symbol of a name, assigning the next free one on first use.
+
+        :param name: The key or class name.
+        :type name: str
+        :return: The symbol of the name.
+        :rtype: int
+        """
+        symbol = _symbols.get(name)
+        if symbol is None:
+            with _lock:
+                symbol = _symbols.get(name)
+                if symbol is None:
+                    symbol = len(_names)
+                    _names.append(sys.intern(name))
+                    _symbols[_names[symbol]] = symbol
+        self._seen.add(symbol)
+        return symbol
+
+    def name(self, symbol: int) -> str:
+        """Get the name of a symbol.
+
+        :param symbol: A symbol returned by any table.
+        :type symbol: int
+        :return: The name the symbol was assigned to.
+        :rtype: str
+        :raises IndexError: If no symbol was assigned yet.
+        """
+        return _names[symbol]
+
+    def key(self, data: bytes) -> NIBKey:
+        """Get the shared key for the UTF-8 encoded name `data`.
+
+        :param data: The key name as stored in the archive.
+        :type data: bytes
+        :return: The shared key.
+        :rtype: NIBKey
+        """
+        key = self._keys.get(data)
+        if key is None:
+            name = data.decode("utf-8")
+            key = self._keys.setdefault(data, NIBKey(len(data), name, self.symbol(name)))
+        return key
+
+    def class_name(self, data: bytes, extras: tuple[int, ...] = ()) -> ClassName:
+        """Get the shared class name for `data` and its extra integers.
+
+        :param data: The class name as stored in the archive, including the
+                     terminating null byte.
+        :type data: bytes
+        :param extras: Extra integers stored with the class name.
+        :type extras: tuple[int, ...]
+        :return: The shared class name.
+        :rtype: ClassName
+        """
+        lookup = (data, tuple(extras))
+        class_name = self._class_names.get(lookup)
+        if class_name is None:
+            # Name is \0 terminated, so we have to remove the trailing \0
+            name = data[:-1].decode("utf-8")
+            class_name = self._class_names.setdefault(
+                lookup,
+                ClassName(len(data), len(extras), name, list(extras), self.symbol(name)),
+            )
+        return class_name
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, name: str) -> bool:
+        return _symbols.get(name) in self._seen
+
+
+_default_symbol_table = SymbolTable()
+
+
+def default_symbol_table() -> SymbolTable:
+    """Get the process-wide symbol table parsers use unless given their own.
+
+    :return: The process-wide symbol table.
+    :rtype: SymbolTable
+    """
+    return _default_symbol_table
@@ -0,0 +1,210 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+
+import loctable as lt
+from localebundle import base_locale, locale_dirs, nib_file
+from localecache import ArtifactCache, bundle_fingerprint
+
+# Builds the localization artifacts `utils.lua` would otherwise build on the
+# first lookup for an app (loctable slices, title maps of base-locale NIBs and
+# alignments of localized NIBs against them), for every app below an Applications root. Bundles are
+# processed by a pool of low-priority worker processes; finished bundles are
+# recorded together with their fingerprint, so an interrupted run resumes where
+# it stopped and unchanged apps are skipped on the next run.
+
+PROGRESS = 'prewarm.json'
+
+
+def find_bundles(root):
+    """App bundles below `root`, not descending into bundles themselves."""
+    stack = [root]
+    while stack:
+        try:
+            entries = sorted(os.scandir(stack.pop()), key=lambda e: e.name, reverse=True)
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            if entry.name.endswith('.app'):
+                yield entry.path
+            elif not entry.name.startswith('.'):
+                stack.append(entry.path)
+
+
+def prewarm_bundle(app, cache_root, locales=None):
+    """Build all artifacts of one app; runs in a worker process.
+
+    Returns the number of artifacts built and a list of (source, error) of
+    those that could not be.
+    """
+    import nib_parse
+
+    cache = ArtifactCache(cache_root)
+    resource_dir = os.path.join(app, 'Contents', 'Resources')
+    count = 0
+    failures = []
+    with cache.batch():
+        for name in sorted(os.listdir(resource_dir)) if os.path.isdir(resource_dir) else []:
+            if name.endswith('.loctable'):
+                path = os.path.join(resource_dir, name)
+                try:
+                    count += lt.warm(path, cache)
+                except Exception as e:
+                    failures.append((path, str(e)))
+
+        locales_found = locale_dirs(resource_dir)
+        base = base_locale(locales_found)
+        if base is None:
+            return count, failures
+        base_dir = os.path.join(resource_dir, base + '.lproj')
+        for name in sorted(os.listdir(base_dir)):
+            if not name.endswith('.nib'):
+                continue
+            base_path = nib_file(os.path.join(base_dir, name))
+            if base_path is None:
+                continue
+            # the same artifacts parseNibFile and locale_search.py look for
+            targets = [(nib_parse.titles_cache_name(base_path), [base_path],
+                        lambda tmp: nib_parse.write_titles(base_path, tmp))]
+            for locale in locales_found:
+                if locale == base or (locales is not None and locale not in locales):
+                    continue
+                path = nib_file(os.path.join(resource_dir, locale + '.lproj', name))
+                if path is None:
+                    continue
+                targets.append((nib_parse.alignment_cache_name(base_path, path), [base_path, path],
+                                lambda tmp, path=path: nib_parse.write_alignment(base_path, path, tmp)))
+            for artifact, sources, write in targets:
+                if cache.is_fresh(artifact):
+                    continue
+                try:
+                    if cache.fetch(artifact, sources, write) is None:
+                        raise ValueError('no output')
+                    count += 1
+                except Exception as e:
+                    failures.append((sources[-1], str(e)))
+    return count, failures
+
+
+def _lower_priority(niceness):
+    try:
+        os.nice(niceness)
+    except OSError:
+        pass
+
+
+class Progress:
+    """Fingerprints of the bundles a previous run finished, and for which locales."""
+
+    def __init__(self, cache_root):
+        self.path = os.path.join(cache_root, PROGRESS)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fp:
+                self.done = json.load(fp)
+        except (OSError, ValueError):
+            self.done = {}
+
+    def is_done(self, app, locales=None):
+        """Whether `app` is unchanged since a run that covered `locales` (None for all)."""
+        done = self.done.get(app)
+        if not isinstance(done, dict) or 'fingerprint' not in done:
+            return False
+        if done['fingerprint'] != bundle_fingerprint(app):
+            return False
+        return done['locales'] is None or (locales is not None and set(locales) <= set(done['locales']))
+
+    def mark_done(self, app, locales=None):
+        fingerprint = bundle_fingerprint(app)
+        if locales is not None:
+            # keep the locales an earlier run built for the same bundle
+            done = self.done.get(app)
+            if isinstance(done, dict) and done.get('fingerprint') == fingerprint:
+                if done['locales'] is None:
+                    return
+                locales = set(locales) | set(done['locales'])
+        self.done[app] = {'fingerprint': fingerprint, 'locales': None if locales is None else sorted(locales)}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = '%s.%d' % (self.path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            json.dump(self.done, fp, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def prewarm(root, cache_root, jobs=None, niceness=10, locales=None, force=False):
+    """Prewarm every app below `root`; returns the failures of each bundle that had any."""
+    progress = Progress(cache_root)
+    pending = []
+    for app in find_bundles(root):
+        if force or not progress.is_done(app, locales):
+            pending.append(app)
+    failed = {}
+    if not pending:
+        return failed
+
+    jobs = jobs or max(1, (os.cpu_count() or 2) // 2)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=_lower_priority, initargs=(niceness,)
+    ) as executor:
+        # at most two bundles per worker are queued at any time
+        running = {}
+        queue = iter(pending)
+        while True:
+            for app in queue:
+                future = executor.submit(prewarm_bundle, app, cache_root, locales)
+                running[future] = app
+                if len(running) >= 2 * jobs:
+                    break
+            if not running:
+                break
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                app = running.pop(future)
+                try:
+                    count, failures = future.result()
+                except Exception as e:
+                    failures = [(app, str(e))]
+                    count = 0
+                if failures:
+                    # not marked done, so the next run retries the bundle
+                    print(f"> Prewarming {app}... Failed ({count} artifacts, {len(failures)} failed)")
+                    for source, error in failures:
+                        print(f"    {source}: {error}")
+                    failed[app] = failures
+                    continue
+                progress.mark_done(app, locales)
+                print(f"> Prewarming {app}... Ok ({count} artifacts)")
+    return failed
+
+
+def main(cmd=None):
+    parser = argparse.ArgumentParser(
+        description="Build localization caches for all installed apps ahead of time."
+    )
+    parser.add_argument("root", nargs="?", default="/Applications", help="Applications root.")
+    parser.add_argument(
+        "-c", "--cache", required=True,
+        help="Root of the locale cache; must be the localeTmpDir of utils.lua "
+             "(hs.fs.temporaryDirectory() .. 'org.hammerspoon.Hammerspoon/locale/').",
+    )
+    parser.add_argument("-j", "--jobs", type=int, help="Number of worker processes.")
+    parser.add_argument("-n", "--nice", type=int, default=10, help="Niceness of the workers.")
+    parser.add_argument(
+        "-l", "--locale", action="append", dest="locales",
+        help="Only prewarm NIBs of this locale (repeatable; base locales are always included).",
+    )
+    parser.add_argument("-f", "--force", action="store_true", help="Ignore progress of previous runs.")
+    args = parser.parse_args(cmd)
+    try:
+        failed = prewarm(args.root, args.cache, args.jobs, args.nice, args.locales, args.force)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
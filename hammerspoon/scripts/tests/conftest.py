@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the scripts are run from their directory by utils.lua and import each other
+# as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
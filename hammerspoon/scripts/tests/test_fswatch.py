@@ -0,0 +1,94 @@
+import os
+import select
+import sys
+
+import pytest
+
+import fswatch
+
+
+def is_nib(name):
+    return name.endswith('.nib')
+
+
+def kqueue_watcher(roots):
+    return fswatch.KqueueWatcher(roots, files=is_nib)
+
+
+def inotify_watcher(roots):
+    return fswatch.InotifyWatcher(roots)
+
+
+def polling_watcher(roots):
+    return fswatch.PollingWatcher(roots, interval=0.01, files=is_nib)
+
+
+WATCHERS = [
+    pytest.param(kqueue_watcher, marks=pytest.mark.skipif(
+        not hasattr(select, 'kqueue'), reason='select.kqueue is not available')),
+    pytest.param(inotify_watcher, marks=pytest.mark.skipif(
+        not sys.platform.startswith('linux'), reason='inotify is Linux only')),
+    polling_watcher,
+]
+
+
+def wait_for(watcher, expected):
+    """Changed directories reported until all of `expected` were, or a timeout."""
+    changed = set()
+    for _ in range(50):
+        more = watcher.wait(0.1)
+        if more is None:
+            return None
+        changed |= more
+        if expected <= changed:
+            break
+    return changed
+
+
+@pytest.fixture
+def tree(tmp_path):
+    lproj = tmp_path / 'App.app' / 'Contents' / 'Resources' / 'fr.lproj'
+    lproj.mkdir(parents=True)
+    (lproj / 'MainMenu.nib').write_bytes(b'NIBArchive')
+    return str(tmp_path), str(lproj)
+
+
+@pytest.mark.parametrize('open_watcher', WATCHERS)
+def test_file_modified_in_place(tree, open_watcher):
+    root, lproj = tree
+    with open_watcher([root]) as watcher:
+        with open(os.path.join(lproj, 'MainMenu.nib'), 'ab') as fp:
+            fp.write(b'\0' * 16)
+        assert lproj in wait_for(watcher, {lproj})
+
+
+@pytest.mark.parametrize('open_watcher', WATCHERS)
+def test_new_directories_are_watched(tree, open_watcher):
+    root, lproj = tree
+    with open_watcher([root]) as watcher:
+        de = os.path.join(os.path.dirname(lproj), 'de.lproj')
+        os.mkdir(de)
+        assert os.path.dirname(lproj) in wait_for(watcher, {os.path.dirname(lproj)})
+        with open(os.path.join(de, 'MainMenu.nib'), 'wb') as fp:
+            fp.write(b'NIBArchive')
+        assert de in wait_for(watcher, {de})
+
+
+@pytest.mark.parametrize('open_watcher', WATCHERS)
+def test_atomic_replace(tree, open_watcher):
+    root, lproj = tree
+    nib = os.path.join(lproj, 'MainMenu.nib')
+    with open_watcher([root]) as watcher:
+        for size in (32, 64):
+            with open(nib + '.tmp', 'wb') as fp:
+                fp.write(b'\0' * size)
+            os.replace(nib + '.tmp', nib)
+            assert lproj in wait_for(watcher, {lproj})
+
+
+def test_kqueue_is_opt_in(tree):
+    root, _ = tree
+    with fswatch.open_watcher([root], files=is_nib) as watcher:
+        assert not isinstance(watcher, fswatch.KqueueWatcher)
+    with fswatch.open_watcher([root], files=is_nib, kqueue=True) as watcher:
+        assert isinstance(watcher, fswatch.KqueueWatcher) == hasattr(select, 'kqueue')
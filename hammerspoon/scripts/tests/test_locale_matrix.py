@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import bench_fixtures
+import locale_matrix
+from locale_matrix import LocaleMatrix
+
+LOCTABLE = 'loctable/Localizable.loctable'
+NIB = 'nib/MainMenu'
+
+
+@pytest.fixture(params=[False, True], ids=['nibarchive', 'keyed'])
+def matrix_path(request, tmp_path):
+    app = bench_fixtures.make_app(str(tmp_path), keyed=request.param)
+    lproj = os.path.join(app, 'Contents', 'Resources', 'de.lproj')
+    broken = os.path.join(lproj, 'MainMenu.nib', 'keyedobjects.nib') if request.param \
+        else os.path.join(lproj, 'MainMenu.nib')
+    with open(broken, 'wb') as fp:
+        fp.write(b'bplist00' + b'\xff' * 10 if request.param else b'NIBArchive' + b'\xff' * 10)
+    return locale_matrix.export(app, str(tmp_path / ('Bench' + locale_matrix.SUFFIX)))
+
+
+def test_round_trip(matrix_path):
+    titles = {key: title for title, key in bench_fixtures.MENU}
+    with LocaleMatrix(matrix_path) as matrix:
+        assert matrix.tables == [LOCTABLE, NIB]
+        assert matrix.locales == ['de', 'en', 'fr']
+
+        keys = matrix.keys(LOCTABLE)
+        assert keys == sorted(titles)
+        fr = dict(zip((key for _, key in bench_fixtures.MENU), bench_fixtures.TRANSLATIONS['fr']))
+        assert matrix.column(LOCTABLE, 'fr') == [fr[key] for key in keys]
+        assert matrix.column(LOCTABLE, 'en') == [titles[key] for key in keys]
+        # single values are read without decoding their column
+        assert [matrix.value(LOCTABLE, 'de', row) for row in range(len(keys))] == matrix.column(LOCTABLE, 'de')
+        with pytest.raises(IndexError):
+            matrix.value(LOCTABLE, 'de', len(keys))
+        assert matrix.column(LOCTABLE, 'it') is None and matrix.value(LOCTABLE, 'it', 0) is None
+
+        # the German NIB is broken, so the NIB table has no German column
+        assert matrix.keys(NIB) == [title for title, _ in bench_fixtures.MENU]
+        assert matrix.column(NIB, 'fr') == bench_fixtures.TRANSLATIONS['fr']
+        assert matrix.column(NIB, 'en') == matrix.keys(NIB)
+        assert matrix.column(NIB, 'de') is None
+        assert list(matrix.header['skipped']) == [NIB] and list(matrix.header['skipped'][NIB]) == ['de']
+
+        assert matrix.localize('Save As…', 'fr') == 'Enregistrer sous…'
+        assert matrix.localize('Enregistrer sous…', 'fr', delocalize=True) == 'Save As…'
+        assert matrix.localize('Nothing', 'fr') is None
+
+
+def test_layout(matrix_path):
+    with LocaleMatrix(matrix_path) as matrix:
+        tables = {table['name']: table for table in matrix.header['tables']}
+        blocks = matrix.header['blocks']
+    # the base column of a NIB is its keys, stored once
+    assert tables[NIB]['columns']['en'] == tables[NIB]['keys']
+    used = {table['keys'] for table in tables.values()}
+    used.update(block for table in tables.values() for block in table['columns'].values())
+    assert used == set(range(len(blocks)))
+
+    with open(matrix_path, 'rb') as fp:
+        data = fp.read()
+    magic, version, size = locale_matrix.PREAMBLE.unpack_from(data, 0)
+    assert (magic, version) == (locale_matrix.MAGIC, locale_matrix.VERSION)
+    start = -(-(locale_matrix.PREAMBLE.size + size) // 8) * 8
+    end = start
+    for offset, length in blocks:
+        # blocks are 8-aligned, in order and zero-padded in between
+        assert offset % 8 == 0 and start + offset >= end
+        assert data[end:start + offset].strip(b'\0') == b''
+        end = start + offset + length
+    assert end == len(data)
@@ -0,0 +1,43 @@
+import locale_search
+
+
+def probe(index, hit):
+    return 'hit %d' % index if hit else None
+
+
+def failing_probe(index, hit):
+    if index == 0:
+        raise ValueError(index)
+    return probe(index, hit)
+
+
+def candidates(hits, count):
+    return [(index, index in hits) for index in range(count)]
+
+
+def test_preferential_hit_only_probes_it():
+    probed = []
+
+    def recording(index, hit):
+        probed.append(index)
+        return probe(index, hit)
+
+    assert locale_search.run_search(recording, candidates({0, 1}, 10), jobs=4) == (0, 'hit 0')
+    assert probed == [0]
+
+
+def test_warm_candidates_cannot_overtake_cold_ones():
+    found = locale_search.run_search(
+        probe, candidates({4, 6}, 10), jobs=1, is_warm=lambda index, hit: index in (6, 8),
+    )
+    assert found == (4, 'hit 4')
+    found = locale_search.run_search(
+        probe, candidates({6, 8}, 10), jobs=1, is_warm=lambda index, hit: index in (6, 8),
+    )
+    assert found == (6, 'hit 6')
+
+
+def test_cold_candidates_fan_out_to_processes():
+    count = locale_search.PROCESS_THRESHOLD + 4
+    assert locale_search.run_search(failing_probe, candidates({5, 9}, count), jobs=2) == (5, 'hit 5')
+    assert locale_search.run_search(failing_probe, candidates(set(), count), jobs=2) is None
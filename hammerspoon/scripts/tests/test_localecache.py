@@ -0,0 +1,204 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+import bench_fixtures
+import localecache
+from localecache import ArtifactCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_fingerprints():
+    # bundle fingerprints are memoized per process, as every lookup is one
+    localecache._bundle_fingerprints.clear()
+    yield
+    localecache._bundle_fingerprints.clear()
+
+
+@pytest.fixture
+def app(tmp_path):
+    return bench_fixtures.make_app(str(tmp_path))
+
+
+def source_of(app):
+    return os.path.join(app, 'Contents', 'Resources', 'Localizable.loctable')
+
+
+def writer(data):
+    def build(tmp):
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            fp.write(data)
+    return build
+
+
+def update_app(app, new_source=None):
+    """Simulate an app update, optionally changing the loctable."""
+    if new_source is not None:
+        with open(source_of(app), 'wb') as fp:
+            fp.write(new_source)
+    info = os.path.join(app, 'Contents', 'Info.plist')
+    st = os.stat(info)
+    os.utime(info, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    localecache._bundle_fingerprints.clear()
+
+
+def test_fetch_builds_once(tmp_path, app):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    calls = []
+
+    def build(tmp):
+        calls.append(tmp)
+        writer('x')(tmp)
+
+    path = cache.fetch('loctable/a.json', [source_of(app)], build)
+    assert ArtifactCache(cache.root).fetch('loctable/a.json', [source_of(app)], build) == path
+    assert len(calls) == 1
+    assert os.path.exists(cache.entry_path('loctable/a.json'))
+    assert not any(name.endswith('.tmp') for name in os.listdir(os.path.dirname(path)))
+
+
+def test_bundle_unchanged_is_trusted(tmp_path, app):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    cache.fetch('a.json', [source_of(app)], writer('x'))
+    with open(source_of(app), 'ab') as fp:
+        fp.write(b'\0')
+    # sources are only checked once the bundle changed
+    assert ArtifactCache(cache.root).is_fresh('a.json')
+    update_app(app)
+    assert not ArtifactCache(cache.root).is_fresh('a.json')
+
+
+def test_updated_source_is_stale(tmp_path, app):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    cache.fetch('a.json', [source_of(app)], writer('x'))
+    update_app(app, b'changed')
+    assert not ArtifactCache(cache.root).is_fresh('a.json')
+
+
+def test_same_content_is_restamped(tmp_path, app):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    cache.fetch('a.json', [source_of(app)], writer('x'))
+    before = cache.entry('a.json')
+    with open(source_of(app), 'rb') as fp:
+        data = fp.read()
+    update_app(app, data)
+    cache = ArtifactCache(cache.root)
+    assert cache.is_fresh('a.json')
+    after = ArtifactCache(cache.root).entry('a.json')
+    assert after['sources'][0]['hash'] == before['sources'][0]['hash']
+    assert after['sources'][0]['mtime'] != before['sources'][0]['mtime']
+    assert after['bundle_fingerprint'] != before['bundle_fingerprint']
+
+
+def test_eviction_is_least_recently_used(tmp_path, app):
+    cache = ArtifactCache(str(tmp_path / 'cache'), budget=25)
+    for i, name in enumerate(['old.json', 'mid.json']):
+        cache.fetch(name, [source_of(app)], writer('x' * 10))
+        os.utime(cache.entry_path(name), (1000 + i, 1000 + i))
+    cache.fetch('new.json', [source_of(app)], writer('x' * 10))
+    assert not os.path.exists(cache.path('old.json'))
+    assert not os.path.exists(cache.entry_path('old.json'))
+    assert os.path.exists(cache.path('mid.json'))
+    with open(os.path.join(cache.root, localecache.USAGE)) as fp:
+        assert json.load(fp)['size'] == 20
+
+    # the artifact just built is kept even if it alone exceeds the budget
+    cache.fetch('big.json', [source_of(app)], writer('x' * 40))
+    assert os.path.exists(cache.path('big.json'))
+    assert not os.path.exists(cache.path('mid.json'))
+
+
+def test_invalidate_prefix(tmp_path, app):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    for name in ['titles/a.json', 'titles/b.json', 'aligned/a.json']:
+        cache.fetch(name, [source_of(app)], writer('xx'))
+    cache.invalidate('titles/')
+    assert [name for name, _, _ in cache.entries()] == ['aligned/a.json']
+    assert not os.path.exists(cache.path('titles/a.json'))
+
+
+def test_dependents(tmp_path, app):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    info = os.path.join(app, 'Contents', 'Info.plist')
+    cache.fetch('aligned/a.json', [source_of(app), info], writer('x'))
+    cache.fetch('aligned/b.json', [info], writer('x'))
+    assert cache.dependents(source_of(app), 'aligned/') == ['aligned/a.json']
+
+
+def test_check_bundle_adopts_and_invalidates(tmp_path, app):
+    root = str(tmp_path / 'cache')
+    locale_dir = os.path.join(root, bench_fixtures.BUNDLE_ID, 'fr')
+    os.makedirs(locale_dir)
+    with open(os.path.join(locale_dir, 'MainMenu.json'), 'w') as fp:
+        fp.write('{}')
+
+    cache = ArtifactCache(root)
+    assert not cache.check_bundle(bench_fixtures.BUNDLE_ID, app)
+    name = bench_fixtures.BUNDLE_ID + '/fr/MainMenu.json'
+    assert ArtifactCache(root).entry(name)['size'] == 2
+    assert ArtifactCache(root).is_fresh(name)
+    assert not ArtifactCache(root).check_bundle(bench_fixtures.BUNDLE_ID, app)
+
+    update_app(app)
+    assert ArtifactCache(root).check_bundle(bench_fixtures.BUNDLE_ID, app)
+    assert not os.path.exists(locale_dir)
+    assert list(ArtifactCache(root).entries()) == []
+
+
+def test_legacy_manifest_is_migrated(tmp_path, app):
+    root = str(tmp_path / 'cache')
+    os.makedirs(os.path.join(root, 'titles'))
+    with open(os.path.join(root, 'titles', 'old-digest.json'), 'w') as fp:
+        fp.write('{}')
+    with open(os.path.join(root, localecache.LEGACY_MANIFEST), 'w') as fp:
+        json.dump({'entries': {'titles/old-digest.json': {}}, 'bundles': {}}, fp)
+
+    cache = ArtifactCache(root)
+    cache.fetch('titles/new.json', [source_of(app)], writer('x'))
+    assert not os.path.exists(os.path.join(root, localecache.LEGACY_MANIFEST))
+    assert not os.path.exists(cache.path('titles/old-digest.json'))
+    assert os.path.exists(cache.path('titles/new.json'))
+
+
+def test_sweep_removes_leftovers_of_killed_builds(tmp_path, app, monkeypatch):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    cache.fetch('aligned/a.json', [source_of(app)], writer('xx'))
+    dead = subprocess.Popen(['true'])
+    dead.wait()
+    leftovers = {
+        'aligned/.b.json.%d.tmp' % dead.pid: True,
+        'aligned/.c.json.%d.tmp' % os.getpid(): False,
+        '.bundles/x.json.%d.tmp' % dead.pid: True,
+        # installed, but killed before the sidecar was written
+        'aligned/orphan.json': True,
+        # written by utils.lua, adopted by check_bundle()
+        bench_fixtures.BUNDLE_ID + '/fr/MainMenu.json': False,
+    }
+    for name in leftovers:
+        os.makedirs(os.path.dirname(cache.path(name)), exist_ok=True)
+        writer('x' * 100)(cache.path(name))
+    # killed between writing the sidecar and accounting for it
+    cache.fetch('aligned/d.json', [source_of(app)], writer('xxx'))
+    with open(os.path.join(cache.root, localecache.USAGE), 'w') as fp:
+        json.dump({'size': 2, 'swept': 0}, fp)
+
+    monkeypatch.setattr(localecache, 'ORPHAN_AGE', -1)
+    cache.sweep()
+    for name, removed in leftovers.items():
+        assert os.path.exists(cache.path(name)) != removed, name
+    assert os.path.exists(cache.path('aligned/a.json'))
+    with open(os.path.join(cache.root, localecache.USAGE)) as fp:
+        assert json.load(fp)['size'] == 5
+
+
+def test_sweep_runs_when_due(tmp_path, app):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    cache.fetch('aligned/a.json', [source_of(app)], writer('xx'))
+    with open(os.path.join(cache.root, localecache.USAGE), 'w') as fp:
+        json.dump({'size': 1000, 'swept': 0}, fp)
+    cache.fetch('aligned/b.json', [source_of(app)], writer('xx'))
+    with open(os.path.join(cache.root, localecache.USAGE)) as fp:
+        usage = json.load(fp)
+    assert usage['size'] == 4 and usage['swept'] > 0
@@ -0,0 +1,41 @@
+import loctable as lt
+from localeindex import NormalizedIndex, normalize, redecorate, strip_mnemonics
+
+
+def test_mnemonics():
+    assert strip_mnemonics('&Save As…') == 'Save As…'
+    assert strip_mnemonics('保存(&S)') == '保存'
+    assert strip_mnemonics('Tom && Jerry') == 'Tom & Jerry'
+
+
+def test_literal_ampersand():
+    assert strip_mnemonics('Find & Replace') == 'Find & Replace'
+    assert normalize('Find & Replace') != normalize('Find Replace')
+
+
+def test_redecorate_keeps_literal_ampersand():
+    data = {'en': {'k': 'Find & Replace'}, 'fr': {'k': 'Rechercher & remplacer'}}
+    assert lt.localize(data, 'Find Replace…', 'fr') is None
+    assert lt.localize(data, 'Find & Replace…', 'fr') == 'Rechercher & remplacer…'
+    assert redecorate('Save As', '&Save As', '&Enregistrer sous') == 'Enregistrer sous'
+
+
+def test_ampersands_inside_words():
+    assert normalize('R&D') == 'R&D'
+    assert normalize('AT&T Mail') == 'AT&T Mail'
+    assert strip_mnemonics('Save &As') == 'Save As'
+    assert strip_mnemonics('&&Open') == '&Open'
+
+
+def test_redecorate_removes_suffixes_the_query_lacks():
+    data = {'en': {'s': 'Save As…', 'n': 'Name:'}, 'fr': {'s': 'Enregistrer sous…', 'n': 'Nom :'}}
+    assert lt.localize(data, 'Save As', 'fr') == 'Enregistrer sous'
+    assert lt.localize(data, 'Name', 'fr') == 'Nom'
+    assert lt.localize(data, 'Save As…', 'fr') == 'Enregistrer sous…'
+    assert lt.delocalize(data, 'Nom', 'fr') == 'Name'
+
+
+def test_punctuation_only_and_empty_strings():
+    assert lt.delocalize({'en': {'a': 'Untitled'}, 'fr': {'a': ''}}, ':', 'fr') is None
+    assert lt.localize({'en': {'a': '', 'b': 'Go'}, 'fr': {'a': 'Aller', 'b': 'Aller'}}, '…', 'fr') is None
+    assert NormalizedIndex([('…', 1), ('', 2)]).lookup(':') == []
@@ -0,0 +1,31 @@
+import io
+
+import pytest
+
+import bench_fixtures
+import nibarchive
+
+
+def archive(pairs, keyed=False):
+    if keyed:
+        return nibarchive.parse_archive(io.BytesIO(bench_fixtures.make_keyed_nib(pairs)))
+    return nibarchive.NIBArchiveParser().parse(io.BytesIO(bench_fixtures.make_nib(pairs)))
+
+
+def test_align_same_structure():
+    base = archive(bench_fixtures.MENU)
+    titles = bench_fixtures.TRANSLATIONS['fr']
+    target = archive([(title, key) for title, (_, key) in zip(titles, bench_fixtures.MENU)])
+    assert nibarchive.align_strings(base, target) == {
+        title: translation for (title, _), translation in zip(bench_fixtures.MENU, titles)
+    }
+
+
+@pytest.mark.parametrize('keyed', [False, True])
+def test_align_large_archives_with_missing_items(keyed):
+    base_pairs = [('String %d' % i, 'k%d.title' % i) for i in range(5000)]
+    target_pairs = [('Chaîne %d' % i, key) for i, (_, key) in enumerate(base_pairs) if i % 500 != 250]
+    base, target = archive(base_pairs, keyed), archive(target_pairs, keyed)
+    # anchored on the keys; bench_nib.py times this case
+    aligned = nibarchive.align_strings(base, target)
+    assert aligned == {'String %d' % i: 'Chaîne %d' % i for i in range(5000) if i % 500 != 250}
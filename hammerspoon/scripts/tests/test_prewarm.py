@@ -0,0 +1,88 @@
+import os
+
+import bench_fixtures
+import loctable as lt
+import nib_parse
+import prewarm
+from localebundle import nib_file
+from localecache import ArtifactCache
+
+
+def make_tree(tmp_path):
+    root = tmp_path / 'Applications'
+    apps = [
+        bench_fixtures.make_app(str(root)),
+        bench_fixtures.make_app(str(root / 'Utilities'), 'Keyed', bundle_id='org.bench.keyed', keyed=True),
+    ]
+    return str(root), apps
+
+
+def test_find_bundles(tmp_path):
+    root, apps = make_tree(tmp_path)
+    assert sorted(prewarm.find_bundles(root)) == sorted(apps)
+
+
+def test_prewarm_builds_lookup_artifacts(tmp_path, capsys):
+    root, apps = make_tree(tmp_path)
+    cache_root = str(tmp_path / 'cache')
+    assert prewarm.prewarm(root, cache_root, jobs=1) == {}
+
+    cache = ArtifactCache(cache_root)
+    for app in apps:
+        resources = os.path.join(app, 'Contents', 'Resources')
+        base = nib_file(os.path.join(resources, 'en.lproj', 'MainMenu.nib'))
+        assert cache.is_fresh(nib_parse.titles_cache_name(base))
+        for locale in bench_fixtures.TRANSLATIONS:
+            target = nib_file(os.path.join(resources, locale + '.lproj', 'MainMenu.nib'))
+            assert cache.is_fresh(nib_parse.alignment_cache_name(base, target))
+        loctable = os.path.join(resources, 'Localizable.loctable')
+        for lang in ['en', 'fr', 'de']:
+            assert cache.is_fresh(lt.slice_name(loctable, lang))
+
+    # a second run finds every bundle done
+    capsys.readouterr()
+    progress = prewarm.Progress(cache_root)
+    assert all(progress.is_done(app) for app in apps)
+    assert prewarm.prewarm(root, cache_root, jobs=1) == {}
+    assert capsys.readouterr().out == ''
+
+
+def test_prewarm_bundle_reports_failures(tmp_path):
+    root, apps = make_tree(tmp_path)
+    broken = os.path.join(apps[0], 'Contents', 'Resources', 'de.lproj', 'MainMenu.nib')
+    with open(broken, 'wb') as fp:
+        fp.write(b'NIBArchive' + b'\xff' * 10)
+    cache_root = str(tmp_path / 'cache')
+    failed = prewarm.prewarm(root, cache_root, jobs=1)
+    assert [source for source, _ in failed[apps[0]]] == [broken]
+    assert not prewarm.Progress(cache_root).is_done(apps[0])
+    assert prewarm.Progress(cache_root).is_done(apps[1])
+
+
+def test_locale_subset_is_not_done_for_all(tmp_path, capsys):
+    root, apps = make_tree(tmp_path)
+    cache_root = str(tmp_path / 'cache')
+    assert prewarm.prewarm(root, cache_root, jobs=1, locales=['fr']) == {}
+    progress = prewarm.Progress(cache_root)
+    assert progress.is_done(apps[0], ['fr'])
+    assert not progress.is_done(apps[0], ['fr', 'de'])
+    assert not progress.is_done(apps[0])
+    progress.mark_done(apps[0], ['de'])
+    assert prewarm.Progress(cache_root).is_done(apps[0], ['de', 'fr'])
+
+    capsys.readouterr()
+    assert prewarm.prewarm(root, cache_root, jobs=1) == {}
+    assert capsys.readouterr().out.count('Ok') == len(apps)
+    cache = ArtifactCache(cache_root)
+    resources = os.path.join(apps[0], 'Contents', 'Resources')
+    base = nib_file(os.path.join(resources, 'en.lproj', 'MainMenu.nib'))
+    target = nib_file(os.path.join(resources, 'de.lproj', 'MainMenu.nib'))
+    assert cache.is_fresh(nib_parse.alignment_cache_name(base, target))
+    assert prewarm.Progress(cache_root).is_done(apps[0], ['fr'])
+
+
+def test_bundles_without_identifier(tmp_path):
+    root = str(tmp_path / 'Applications')
+    bench_fixtures.make_app(root, bundle_id=None)
+    assert prewarm.prewarm(root, str(tmp_path / 'cache'), jobs=1) == {}
+    assert prewarm.Progress(str(tmp_path / 'cache')).done
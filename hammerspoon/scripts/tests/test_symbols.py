@@ -0,0 +1,51 @@
+import io
+
+import bench_fixtures
+import nibarchive
+from nibarchive import ClassName, NIBKey, NIBValueType, SymbolTable
+
+
+def parse(data, symbols=None):
+    return nibarchive.NIBArchiveParser(symbols=symbols).parse(io.BytesIO(data))
+
+
+def nested_archives(archive):
+    return [value.data for value in archive.values if value.type == NIBValueType.NIBARCHIVE]
+
+
+def test_names_are_shared_across_archives():
+    symbols = SymbolTable()
+    inner = bench_fixtures.make_nib([('Open…', 'o.title')])
+    first = parse(bench_fixtures.make_nib(bench_fixtures.MENU, nested=[inner]), symbols)
+    second = parse(bench_fixtures.make_nib([('Fichier', 'f.title')], nested=[inner, inner]), symbols)
+    archives = [first, second] + nested_archives(first) + nested_archives(second)
+    assert len(archives) == 5
+    for archive in archives[1:]:
+        assert all(key is other for key, other in zip(archive.keys, first.keys))
+        assert all(name is other for name, other in zip(archive.class_names, first.class_names))
+    assert len(symbols) == 5
+    assert [symbols.name(key.symbol) for key in first.keys] == [key.name for key in first.keys]
+
+
+def test_symbols_are_stable_across_tables():
+    data = bench_fixtures.make_nib(bench_fixtures.MENU)
+    first = parse(data, SymbolTable())
+    # a table that has seen other names first still assigns the same symbols
+    other = SymbolTable()
+    other.symbol('NSSomethingElse')
+    second = parse(data, other)
+    assert [key.symbol for key in first.keys] == [key.symbol for key in second.keys]
+    assert first.keys == second.keys and first.keys[0] is not second.keys[0]
+    assert first.class_names == second.class_names
+    assert 'NSTitle' in other and 'NSTitle' not in SymbolTable()
+
+
+def test_equality_with_and_without_symbols():
+    symbols = SymbolTable()
+    key = symbols.key(b'NSTitle')
+    assert key == NIBKey(7, 'NSTitle') and hash(key) == hash(NIBKey(7, 'NSTitle'))
+    assert key != symbols.key(b'NSKeyEquiv')
+    name = symbols.class_name(b'NSMenuItem\0', (1,))
+    assert name == ClassName(11, 1, 'NSMenuItem', [1])
+    assert name != symbols.class_name(b'NSMenuItem\0')
+    assert name != symbols.class_name(b'NSButton\0', (1,))
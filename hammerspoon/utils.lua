@@ -653,14 +653,31 @@ local function localizeByLoctableImpl(str, filePath, fileStem, locale, localesDi
   end
 
   local output, status = hs.execute(string.format(
-      "/usr/bin/python3 scripts/loctable_localize.py '%s' '%s' %s",
-      filePath, str, locale))
+      "/usr/bin/python3 scripts/loctable_localize.py '%s' '%s' %s '%s'",
+      filePath, str, locale, localeTmpDir))
   if status and output ~= "" then
     localesDict[fileStem][str] = output
     return output
   end
 end
 
+-- search all candidate loctables in one process, concurrently,
+-- returning the hit of the first file in order
+local function searchLoctables(str, resourceDir, files, locale, delocalize)
+  if #files == 0 then return end
+  local paths = {}
+  for _, file in ipairs(files) do
+    table.insert(paths, string.format("'%s'", resourceDir .. '/' .. file .. '.loctable'))
+  end
+  local output, status = hs.execute(string.format(
+      "/usr/bin/python3 scripts/locale_search.py loctable %s '%s' %s -c '%s' %s",
+      delocalize and '-d' or '', str, locale, localeTmpDir, table.concat(paths, ' ')))
+  if status and output ~= "" then
+    local match = hs.json.decode(output)
+    return match.result, match.file:match("^.*/(.*)%.loctable$")
+  end
+end
+
 function localizeByLoctable(str, resourceDir, localeFile, loc, localesDict)
   if localeFile ~= nil then
     local fullPath = resourceDir .. '/' .. localeFile .. '.loctable'
@@ -673,86 +690,25 @@ function localizeByLoctable(str, resourceDir, localeFile, loc, localesDict)
     if #loctableFiles > 10 then
       loctableFiles, preferentialLoctableFiles = filterPreferentialLocaleFiles(loctableFiles)
     end
-    for _, file in ipairs(preferentialLoctableFiles) do
-      local fullPath = resourceDir .. '/' .. file .. '.loctable'
-      local result = localizeByLoctableImpl(str, fullPath, file, loc, localesDict)
-      if result ~= nil then return result end
-    end
-    for _, file in ipairs(loctableFiles) do
-      local fullPath = resourceDir .. '/' .. file .. '.loctable'
-      local result = localizeByLoctableImpl(str, fullPath, file, loc, localesDict)
-      if result ~= nil then return result end
-    end
-  end
-end
-
-local function isBinarayPlist(file)
-  local f = io.open(file, "rb")
-  if f == nil then return false end
-  local firstByte = f:read(1)
-  f:close()
-  return firstByte == "b"
-end
-
-local function parseBinaryPlistFile(file, keepOrder, keepAll)
-  if keepOrder == nil then keepOrder = true end
-  local jsonStr = hs.execute([[
-    plutil -convert xml1 ']] .. file .. [[' -o /dev/stdout | \
-    awk '
-    BEGIN { printf("{"); first = 1 }
-    /<string>.*\.title<\/string>/ {
-      key = $0;
-      sub("<string>", "", key);
-      sub("</string>", "", key);
-      gsub(/^[ \t]+/, "", key);
-      gsub("%", "%%", key);
-      gsub("\"", "\\\"", key);
-
-      getline
-      value = $0;
-      if (value ~ /<string>.*<\/string>/) {
-        sub("<string>", "", value);
-        sub("</string>", "", value);
-        gsub(/^[ \t]+/, "", value);
-        gsub("%", "%%", value);
-        gsub("\"", "\\\"", value);
-        if (!first) printf(", ");
-        printf "\"%s\": \"%s\"", key, value;
-        first = 0;
-      }
-    }
-    END { print "}" }']])
-  local jsonDict = hs.json.decode(jsonStr)
-  if keepOrder then return jsonDict end
-  local localesDict = {}
-  for k, v in pairs(jsonDict) do
-    if localesDict[v] == nil then
-      localesDict[v] = k
-    elseif keepAll then
-      if type(localesDict[v]) == 'string' then
-        localesDict[v] = { localesDict[v], k }
-      else
-        table.insert(localesDict[v], k)
+    local files = hs.fnutils.concat(hs.fnutils.copy(preferentialLoctableFiles), loctableFiles)
+    for _, file in ipairs(files) do
+      if localesDict[file] ~= nil and localesDict[file][str] ~= nil then
+        return localesDict[file][str]
       end
     end
+    local result, file = searchLoctables(str, resourceDir, files, loc)
+    if result ~= nil then
+      if localesDict[file] == nil then localesDict[file] = {} end
+      localesDict[file][str] = result
+      return result
+    end
   end
-  return localesDict
 end
 
 local function parseNibFile(file, keepOrder, keepAll)
   if keepOrder == nil then keepOrder = true end
-  local jsonStr = hs.execute([[
-    /usr/bin/python3 scripts/nib_parse.py dump-json ']] .. file .. [[' -o /dev/stdout | \
-    grep '"data": "' | sed 's/^.*"data": "//;s/"$//' | \
-    awk 'BEGIN { printf("{"); first = 1 } /\.title$/ {
-      key = $0;
-      gsub("%", "%%", prev);
-      if (!first) printf(", ");
-      printf("\"" key "\": \"" prev "\"");
-      first = 0;
-    }
-    { prev = $0 }
-    END { print "}" }']])
+  local jsonStr = hs.execute(string.format(
+      "/usr/bin/python3 scripts/nib_parse.py dump-titles '%s' -c '%s'", file, localeTmpDir))
   local jsonDict = hs.json.decode(jsonStr)
   if keepOrder then return jsonDict end
   local localesDict = {}
@@ -828,11 +784,7 @@ local function localizeByStrings(str, localeDir, localeFile, localesDict, locale
                 if fullPath == "" then return end
               end
             end
-            if isBinarayPlist(fullPath) then
-              invDict = parseBinaryPlistFile(fullPath, false, true)
-            else
-              invDict = parseNibFile(fullPath, false, true)
-            end
+            invDict = parseNibFile(fullPath, false, true)
           end
         end
         local searchFromDict = function(dict)
@@ -893,110 +845,35 @@ local function localizeByStrings(str, localeDir, localeFile, localesDict, locale
   if result ~= nil then return result end
 end
 
-local function localizeByNIB(str, localeDir, localeFile, bundleID)
-  local resourceDir = localeDir .. '/..'
-  local locale = localeDir:match("^.*/(.*)%.lproj$")
-  local enLocaleDir = baseLocaleDirs(resourceDir)[1]
-  local enLocale = enLocaleDir:match("^.*/(.*)%.lproj$")
-  local compareNIBs = function(file)
-    local NIBPath = localeDir .. '/' .. file .. '.nib'
-    local enNIBPath = enLocaleDir .. '/' .. file .. '.nib'
-    if hs.fs.attributes(NIBPath) == nil or hs.fs.attributes(enNIBPath) == nil then return end
-    if hs.fs.attributes(enNIBPath, 'mode') == 'directory' then
-      if hs.fs.attributes(enNIBPath .. '/keyedobjects.nib') ~= nil then
-        enNIBPath = enNIBPath .. '/keyedobjects.nib'
-      else
-        enNIBPath = hs.execute(string.format([[ls '%s'/keyedobjects* | tail -n 1 | tr -d '\n']], enNIBPath))
-        if enNIBPath == "" then return end
-      end
-    end
-    if hs.fs.attributes(NIBPath, 'mode') == 'directory' then
-      if hs.fs.attributes(NIBPath .. '/keyedobjects.nib') ~= nil then
-        NIBPath = NIBPath .. '/keyedobjects.nib'
-      else
-        NIBPath = hs.execute(string.format([[ls '%s'/keyedobjects* | tail -n 1 | tr -d '\n']], NIBPath))
-        if NIBPath == "" then return end
-      end
-    end
-
-    if isBinarayPlist(NIBPath) and isBinarayPlist(enNIBPath) then
-      local xmlDir = localeTmpDir .. bundleID .. '/' .. locale
-      local xmlPath = xmlDir .. '/' .. file .. '.xml'
-      if hs.fs.attributes(xmlPath) == nil then
-        hs.execute(string.format("mkdir -p '%s'", xmlDir))
-        local _, status = hs.execute(string.format(
-            "plutil -convert xml1 '%s' -o '%s'", NIBPath, xmlPath))
-        if not status then return end
-      end
-      local enXmlDir = localeTmpDir .. bundleID .. '/' .. enLocale
-      local enXmlPath = enXmlDir .. '/' .. file .. '.xml'
-      if hs.fs.attributes(enXmlPath) == nil then
-        hs.execute(string.format("mkdir -p '%s'", enXmlDir))
-        local _, status = hs.execute(string.format(
-            "plutil -convert xml1 '%s' -o '%s'", enNIBPath, enXmlPath))
-        if not status then return end
-      end
-      local diffDir = localeTmpDir .. bundleID .. '/' .. enLocale .. '-' .. locale
-      local diffPath = diffDir .. '/' .. file .. '.diff'
-      if hs.fs.attributes(diffPath) == nil then
-        hs.execute(string.format("mkdir -p '%s'", diffDir))
-        hs.execute(string.format(
-                  "diff --suppress-common-lines '%s' '%s' > '%s'", enXmlPath, xmlPath, diffPath))
-      end
-      local result = hs.execute(string.format([[
-          cat '%s' | awk '/^<.*<string>%s<\/string>/ && !found {
-            curline=$0; getline;
-            if ($0 == curline) {getline}
-            if ($0 ~ "---") {getline; print $0; found=1}
-          }' | \
-          sed 's/^>.*<string>//;s/<\/string>$//' | tr -d '\n']],
-          diffPath, str))
-      return result ~= "" and result or nil
-    end
-
-    local enJsonDir = localeTmpDir .. bundleID .. '/' .. enLocale
-    local enJsonPath = enJsonDir .. '/' .. file .. '.json'
-    if hs.fs.attributes(enJsonPath) == nil then
-      hs.execute(string.format("mkdir -p '%s'", enJsonDir))
-      local _, status = hs.execute(string.format("/usr/bin/python3 scripts/nib_parse.py dump-json '%s' -o '%s'",
-                                   enNIBPath, enJsonPath))
-      if not status then return end
-    end
-    local jsonDir = localeTmpDir .. bundleID .. '/' .. locale
-    local jsonPath = jsonDir .. '/' .. file .. '.json'
-    if hs.fs.attributes(jsonPath) == nil then
-      hs.execute(string.format("mkdir -p '%s'", jsonDir))
-      local _, status = hs.execute(string.format("/usr/bin/python3 scripts/nib_parse.py dump-json '%s' -o '%s'",
-                                   NIBPath, jsonPath))
-      if not status then return end
-    end
-    local diffDir = localeTmpDir .. bundleID .. '/' .. enLocale .. '-' .. locale
-    local diffPath = diffDir .. '/' .. file .. '.diff'
-    if hs.fs.attributes(diffPath) == nil then
-      hs.execute(string.format("mkdir -p '%s'", diffDir))
-      hs.execute(string.format("diff --suppress-common-lines '%s' '%s' > '%s'",
-                               enJsonPath, jsonPath, diffPath))
-    end
-    local result = hs.execute(string.format(
-        [[cat '%s' | awk '/^<.*"data": "%s"/ && !found {getline; if ($0 ~ "---") {getline; print $0; found=1}}' | \
-          sed 's/^>.*"data": "//;s/"$//' | tr -d '\n']],
-        diffPath, str))
-    return result ~= "" and result or nil
+-- align NIBs of the base and target locales in one process, whether they are
+-- NIB archives or keyed archive plists, returning the hit of the first file in order
+local function searchNIBs(str, enLocaleDir, localeDir, files, delocalize)
+  if #files == 0 then return end
+  local stems = {}
+  for _, file in ipairs(files) do
+    table.insert(stems, string.format("'%s'", file))
+  end
+  local output, status = hs.execute(string.format(
+      "/usr/bin/python3 scripts/locale_search.py nib %s '%s' '%s' '%s' -c '%s' %s",
+      delocalize and '-d' or '', str, enLocaleDir, localeDir, localeTmpDir, table.concat(stems, ' ')))
+  if status and output ~= "" then
+    return hs.json.decode(output).result
   end
+end
 
+local function localizeByNIB(str, localeDir, localeFile)
+  local resourceDir = localeDir .. '/..'
+  local enLocaleDir = baseLocaleDirs(resourceDir)[1]
+  local nibFiles
   if localeFile ~= nil then
-    local result = compareNIBs(localeFile)
-    if result ~= nil then return result end
+    nibFiles = { localeFile }
   else
-    local nibFiles = collectLocaleFiles(localeDir, { nib = true })
+    nibFiles = collectLocaleFiles(localeDir, { nib = true })
     if #nibFiles > 10 then
       _, nibFiles = filterPreferentialLocaleFiles(nibFiles)
     end
-    for _, file in ipairs(nibFiles) do
-      local result = compareNIBs(file)
-      if result ~= nil then return result end
-    end
   end
+  return searchNIBs(str, enLocaleDir, localeDir, nibFiles)
 end
 
 local function localizeByQtImpl(str, file)
@@ -1172,6 +1049,23 @@ if hs.fs.attributes(localeTmpFile) ~= nil then
   end
 end
 
+-- artifacts under `localeTmpDir` and translations found for an app are dropped
+-- once per session if the app has been updated since they were built
+local localeCacheStates = {}
+local function localeCacheOutdated(bundleID, consumer)
+  local state = localeCacheStates[bundleID]
+  if state == nil then
+    local output, status = hs.execute(string.format(
+        "/usr/bin/python3 scripts/localecache.py check '%s' '%s' '%s'",
+        localeTmpDir, bundleID, hs.application.pathForBundleID(bundleID)))
+    state = { outdated = status and output == "outdated" }
+    localeCacheStates[bundleID] = state
+  end
+  if not state.outdated or state[consumer] then return false end
+  state[consumer] = true
+  return true
+end
+
 local function localizedStringImpl(str, bundleID, params, force)
   local appLocale, localeFile, localeFramework
   if type(params) == "table" then
@@ -1190,6 +1084,15 @@ local function localizedStringImpl(str, bundleID, params, force)
 
   local result
 
+  if hs.application.pathForBundleID(bundleID) ~= nil
+      and hs.application.pathForBundleID(bundleID) ~= ""
+      and localeCacheOutdated(bundleID, 'localize') then
+    appLocaleMap[bundleID] = nil
+    appLocaleDir[bundleID] = nil
+    appLocaleAssetBuffer[bundleID] = nil
+    appLocaleAssetBufferInverse[bundleID] = nil
+  end
+
   if not force then
     result = get(appLocaleMap, bundleID, appLocale, str)
     if result == false then return nil
@@ -1318,11 +1221,13 @@ local function localizedStringImpl(str, bundleID, params, force)
                                appLocaleAssetBufferInverse[bundleID])
     if result ~= nil then return result end
 
-    result = localizeByNIB(str, localeDir, localeFile, bundleID)
+    result = localizeByNIB(str, localeDir, localeFile)
     if result ~= nil then return result end
 
+    -- loctable and NIB lookups already resolve ellipsis variants
     if string.sub(str, -3) == "..." or string.sub(str, -3) == "…" then
-      result = localizedString(string.sub(str, 1, -4), bundleID, params)
+      result = localizeByStrings(string.sub(str, 1, -4), localeDir, localeFile, localesDict,
+                                 appLocaleAssetBufferInverse[bundleID])
       if result ~= nil then
         return result .. string.sub(str, -3)
       end
@@ -1384,8 +1289,8 @@ end
 
 local function delocalizeByLoctableImpl(str, filePath, locale)
   local output, status = hs.execute(string.format(
-      "/usr/bin/python3 scripts/loctable_delocalize.py '%s' '%s' %s",
-      filePath, str, locale))
+      "/usr/bin/python3 scripts/loctable_delocalize.py '%s' '%s' %s '%s'",
+      filePath, str, locale, localeTmpDir))
   if status and output ~= "" then return output end
 end
 
@@ -1401,14 +1306,8 @@ local function delocalizeByLoctable(str, resourceDir, localeFile, locale)
     if #loctableFiles > 10 then
       loctableFiles, preferentialLoctableFiles = filterPreferentialLocaleFiles(loctableFiles)
     end
-    for _, file in ipairs(preferentialLoctableFiles) do
-      local result = delocalizeByLoctableImpl(str, resourceDir .. '/' .. file .. '.loctable', locale)
-      if result ~= nil then return result end
-    end
-    for _, file in ipairs(loctableFiles) do
-      local result = delocalizeByLoctableImpl(str, resourceDir .. '/' .. file .. '.loctable', locale)
-      if result ~= nil then return result end
-    end
+    local files = hs.fnutils.concat(hs.fnutils.copy(preferentialLoctableFiles), loctableFiles)
+    return searchLoctables(str, resourceDir, files, locale, true)
   end
 end
 
@@ -1431,11 +1330,7 @@ local function delocalizeByStrings(str, localeDir, localeFile, deLocalesInvDict)
             if fullPath == "" then return end
           end
         end
-        if isBinarayPlist(fullPath) then
-          jsonDict = parseBinaryPlistFile(fullPath)
-        else
-          jsonDict = parseNibFile(fullPath)
-        end
+        jsonDict = parseNibFile(fullPath)
       end
       if jsonDict ~= nil and jsonDict[str] ~= nil then
         return jsonDict[str]
@@ -1496,110 +1391,19 @@ local function delocalizeByStrings(str, localeDir, localeFile, deLocalesInvDict)
   end
 end
 
-local function delocalizeByNIB(str, localeDir, localeFile, bundleID)
+local function delocalizeByNIB(str, localeDir, localeFile)
   local resourceDir = localeDir .. '/..'
-  local locale = localeDir:match("^.*/(.*)%.lproj$")
   local enLocaleDir = baseLocaleDirs(resourceDir)[1]
-  local enLocale = enLocaleDir:match("^.*/(.*)%.lproj$")
-  local compareNIBs = function(file)
-    local NIBPath = localeDir .. '/' .. file .. '.nib'
-    local enNIBPath = enLocaleDir .. '/' .. file .. '.nib'
-    if hs.fs.attributes(NIBPath) == nil or hs.fs.attributes(enNIBPath) == nil then return end
-    if hs.fs.attributes(NIBPath, 'mode') == 'directory' then
-      if hs.fs.attributes(NIBPath .. '/keyedobjects.nib') ~= nil then
-        NIBPath = NIBPath .. '/keyedobjects.nib'
-      else
-        NIBPath = hs.execute(string.format([[ls '%s'/keyedobjects* | tail -n 1 | tr -d '\n']], NIBPath))
-        if NIBPath == "" then return end
-      end
-    end
-    if hs.fs.attributes(enNIBPath, 'mode') == 'directory' then
-      if hs.fs.attributes(enNIBPath .. '/keyedobjects.nib') ~= nil then
-        enNIBPath = enNIBPath .. '/keyedobjects.nib'
-      else
-        enNIBPath = hs.execute(string.format([[ls '%s'/keyedobjects* | tail -n 1 | tr -d '\n']], enNIBPath))
-        if enNIBPath == "" then return end
-      end
-    end
-
-    if isBinarayPlist(NIBPath) and isBinarayPlist(enNIBPath) then
-      local xmlDir = localeTmpDir .. bundleID .. '/' .. locale
-      local xmlPath = xmlDir .. '/' .. file .. '.xml'
-      if hs.fs.attributes(xmlPath) == nil then
-        hs.execute(string.format("mkdir -p '%s'", xmlDir))
-        local _, status = hs.execute(string.format(
-            "plutil -convert xml1 '%s' -o '%s'", NIBPath, xmlPath))
-        if not status then return end
-      end
-      local enXmlDir = localeTmpDir .. bundleID .. '/' .. enLocale
-      local enXmlPath = enXmlDir .. '/' .. file .. '.xml'
-      if hs.fs.attributes(enXmlPath) == nil then
-        hs.execute(string.format("mkdir -p '%s'", enXmlDir))
-        local _, status = hs.execute(string.format(
-            "plutil -convert xml1 '%s' -o '%s'", enNIBPath, enXmlPath))
-        if not status then return end
-      end
-      local diffDir = localeTmpDir .. bundleID .. '/' .. locale .. '-' .. enLocale
-      local diffPath = diffDir .. '/' .. file .. '.diff'
-      if hs.fs.attributes(diffPath) == nil then
-        hs.execute(string.format("mkdir -p '%s'", diffDir))
-        hs.execute(string.format("diff --suppress-common-lines '%s' '%s' > '%s'",
-                                 xmlPath, enXmlPath, diffPath))
-      end
-      local result = hs.execute(string.format([[
-          cat '%s' | awk '/^<.*<string>%s<\/string>/ && !found {
-            curline=$0; getline;
-            if ($0 == curline) {getline}
-            if ($0 ~ "---") {getline; print $0}; found=1
-          }' | \
-          sed 's/^>.*<string>//;s/<\/string>$//' | tr -d '\n']],
-          diffPath, str))
-      return result ~= "" and result or nil
-    end
-
-    local jsonDir = localeTmpDir .. bundleID .. '/' .. locale
-    local jsonPath = jsonDir .. '/' .. file .. '.json'
-    if hs.fs.attributes(jsonPath) == nil then
-      hs.execute(string.format("mkdir -p '%s'", jsonDir))
-      local _, status = hs.execute(string.format("/usr/bin/python3 scripts/nib_parse.py dump-json '%s' -o '%s'",
-                                   NIBPath, jsonPath))
-      if not status then return end
-    end
-    local enJsonDir = localeTmpDir .. bundleID .. '/' .. enLocale
-    local enJsonPath = enJsonDir .. '/' .. file .. '.json'
-      if hs.fs.attributes(enJsonPath) == nil then
-      hs.execute(string.format("mkdir -p '%s'", enJsonDir))
-      local _, status = hs.execute(string.format("/usr/bin/python3 scripts/nib_parse.py dump-json '%s' -o '%s'",
-                                   enLocaleDir .. '/' .. file .. '.nib', enJsonPath))
-      if not status then return end
-    end
-    local diffDir = localeTmpDir .. bundleID .. '/' .. locale .. '-' .. enLocale
-    local diffPath = diffDir .. '/' .. file .. '.diff'
-    if hs.fs.attributes(diffPath) == nil then
-      hs.execute(string.format("mkdir -p '%s'", diffDir))
-      hs.execute(string.format("diff --suppress-common-lines '%s' '%s' > '%s'",
-                               jsonPath, enJsonPath, diffPath))
-    end
-    local result = hs.execute(string.format(
-        [[cat '%s' | awk '/^<.*"data": "%s"/ && !found {getline; if ($0 ~ "---") {getline; print $0; found=1}}' | \
-          sed 's/^>.*"data": "//;s/"$//' | tr -d '\n']],
-        diffPath, str))
-    return result ~= "" and result or nil
-  end
-
+  local nibFiles
   if localeFile ~= nil then
-    local result = compareNIBs(localeFile)
-    if result ~= nil then return result end
+    nibFiles = { localeFile }
   else
-    local nibFiles = collectLocaleFiles(localeDir, { nib = true })
+    nibFiles = collectLocaleFiles(localeDir, { nib = true })
     if #nibFiles > 10 then
       _, nibFiles = filterPreferentialLocaleFiles(nibFiles)
     end
-    for _, file in ipairs(nibFiles) do
-      local result = compareNIBs(file)
-      if result ~= nil then return result end
-    end
   end
+  return searchNIBs(str, enLocaleDir, localeDir, nibFiles, true)
 end
 
 local function delocalizeByQtImpl(str, file)
@@ -1775,6 +1579,13 @@ local function delocalizedStringImpl(str, bundleID, params)
     appLocale = locales[1]
   end
 
+  if hs.application.pathForBundleID(bundleID) ~= nil
+      and hs.application.pathForBundleID(bundleID) ~= ""
+      and localeCacheOutdated(bundleID, 'delocalize') then
+    deLocaleMap[bundleID] = nil
+    deLocaleInversedMap[bundleID] = nil
+  end
+
   local result = get(deLocaleMap, bundleID, appLocale, str)
   if result == false then return nil
   elseif result ~= nil then return result end
@@ -1882,11 +1693,13 @@ local function delocalizedStringImpl(str, bundleID, params)
     result = delocalizeByStrings(str, localeDir, localeFile, deLocaleInversedMap[bundleID])
     if result ~= nil then return result end
 
-    result = delocalizeByNIB(str, localeDir, localeFile, bundleID)
+    result = delocalizeByNIB(str, localeDir, localeFile)
     if result ~= nil then return result end
 
+    -- loctable and NIB lookups already resolve ellipsis variants
     if string.sub(str, -3) == "..." or string.sub(str, -3) == "…" then
-      result = delocalizedString(string.sub(str, 1, -4), bundleID, params)
+      result = delocalizeByStrings(string.sub(str, 1, -4), localeDir, localeFile,
+                                   deLocaleInversedMap[bundleID])
       if result ~= nil then
         return result .. string.sub(str, -3)
       end